@@ -0,0 +1,69 @@
+# assets.py - Player assets loaded once at startup: fingerprinted, precompressed, cached forever
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+from payloads import Payload
+
+logger = logging.getLogger("assets")
+
+ASSET_DIR = Path(__file__).parent / "assets"
+IMMUTABLE = "public, max-age=31536000, immutable"
+MEDIA_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+PLACEHOLDER = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+
+class Asset:
+    def __init__(self, name: str, body: bytes, media_type: str, cache_control: str):
+        self.name = name
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.payload = Payload(body, best=True)
+
+
+class AssetPipeline:
+    """
+    Fingerprints every css/js file in ASSET_DIR (player.css -> player.<hash>.css),
+    rewrites {{player.css}} style placeholders in the html templates to those
+    URLs, and precompresses everything so requests only pick a variant.
+    """
+
+    def __init__(self, asset_dir: Path = ASSET_DIR, url_prefix: str = "/assets"):
+        self.asset_dir = asset_dir
+        self.url_prefix = url_prefix
+        self.files = {}      # fingerprinted name -> Asset
+        self.pages = {}      # template name -> Asset (html, revalidated on every load)
+        self.urls = {}       # logical name -> fingerprinted URL
+
+    def load(self):
+        for path in sorted(self.asset_dir.iterdir()):
+            if path.suffix not in (".css", ".js"):
+                continue
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            hashed = f"{path.stem}.{digest}{path.suffix}"
+            self.files[hashed] = Asset(hashed, body, MEDIA_TYPES[path.suffix], IMMUTABLE)
+            self.urls[path.name] = f"{self.url_prefix}/{hashed}"
+
+        for path in sorted(self.asset_dir.glob("*.html")):
+            html = PLACEHOLDER.sub(lambda m: self.urls[m.group(1)], path.read_text(encoding="utf-8"))
+            # HTML keeps a stable URL, so browsers revalidate it (cheap 304 via ETag)
+            self.pages[path.name] = Asset(path.name, html.encode(), MEDIA_TYPES[".html"], "no-cache")
+
+        logger.info(f"Loaded {len(self.files)} fingerprinted assets and {len(self.pages)} pages")
+        return self
+
+    def get(self, name: str):
+        return self.files.get(name)
+
+    def page(self, name: str):
+        return self.pages[name]
+
+
+# Global instance (loaded at import so the first request never touches disk)
+asset_pipeline = AssetPipeline().load()
@@ -0,0 +1,334 @@
+// player.js - KDRAMA Player client (served fingerprinted from /assets)
+
+let currentLink = null;
+let currentOrigin = null;    // stored (pre-redirect) link of the current server - what beacons report
+let currentFallbacks = [];   // sources to try in order if the current one fails (direct link, original link)
+let relayEnabled = false;    // server offers /relay (first MB of hot episodes served locally)
+let currentQuality = null;   // null while playing a master link (nothing to report)
+let player = null;
+let stallTimer = null;
+let beaconQueue = [];
+let beaconTimer = null;
+const reportedLinks = new Set();
+const STALL_MS = 15000;
+let cooldownInterval;
+let scrapeEvents = null;
+
+function showCooldownPopup(minutes) {
+    const popup = document.getElementById('cooldownPopup');
+    const cooldownTimeElement = document.getElementById('cooldownTime');
+    cooldownTimeElement.textContent = `${Math.floor(minutes)}:00`;
+    popup.style.display = 'block';
+
+    // Clear any existing interval
+    if (cooldownInterval) {
+        clearInterval(cooldownInterval);
+    }
+
+    let remainingTime = minutes * 60; // Convert to seconds
+
+    cooldownInterval = setInterval(() => {
+        remainingTime--;
+        let displayMinutes = Math.floor(remainingTime / 60);
+        let displaySeconds = remainingTime % 60;
+        cooldownTimeElement.textContent = `${displayMinutes}:${displaySeconds < 10 ? '0' : ''}${displaySeconds}`;
+
+        if (remainingTime <= 0) {
+            clearInterval(cooldownInterval);
+            notifyCooldownOver();
+        }
+    }, 1000);
+}
+
+function notifyCooldownOver() {
+    alert("Cooldown is over! You can now force scrape again.");
+    closePopup();
+}
+
+function closePopup() {
+    document.getElementById('cooldownPopup').style.display = 'none';
+}
+
+async function loadEpisode() {
+  // Existing loadEpisode function
+  try {
+    const params = new URLSearchParams(window.location.search);
+    const show = params.get("show");
+    const ep = params.get("ep");
+    if (!show || !ep) {
+      document.getElementById("servers").innerText = "💦 Missing show/ep params";
+      return;
+    }
+    document.getElementById("status").innerText = "Loading episode data...";
+
+    // no-cache = always revalidate with the ETag (cheap 304 when nothing changed)
+    const res = await fetch(`/get_link?show=${encodeURIComponent(show)}&ep=${encodeURIComponent(ep)}`, { cache: "no-cache" });
+    if (!res.ok) {
+      throw new Error(`HTTP ${res.status}: ${res.statusText}`);
+    }
+
+    let data = await res.json();
+    console.log("Episode data:", data);
+    const serversDiv = document.getElementById("servers");
+    const downloadsDiv = document.getElementById("downloads");
+    const statusDiv = document.getElementById("status");
+    const serverCountDiv = document.getElementById("server-count");
+    const warningDiv = document.getElementById("warning");
+
+    serversDiv.innerHTML = "";
+    downloadsDiv.innerHTML = "";
+    warningDiv.style.display = "none";
+    if (data.server_info) {
+        serverCountDiv.innerText = `Servers: ${data.server_info.server_count}/9`;
+
+        if (data.server_info.needs_force_scrape) {
+            warningDiv.innerText = data.server_info.message;
+            warningDiv.style.display = "block";
+        }
+    }
+    if (!player) {
+      player = videojs("videoPlayer", {
+        fluid: true,
+        responsive: true,
+        playbackRates: [0.5, 1, 1.25, 1.5, 2]
+      });
+      player.on("error", () => {
+        if (currentFallbacks.length) {
+          // Relay failed or the pre-resolved URL expired early; the original link redirects to a fresh one
+          currentLink = currentFallbacks.shift();
+          player.src({ src: currentLink, type: "video/mp4" });
+          player.ready(() => player.play().catch(() => {}));
+          return;
+        }
+        reportPlayback("error");
+      });
+      player.on("waiting", () => {
+        clearTimeout(stallTimer);
+        stallTimer = setTimeout(() => reportPlayback("stall"), STALL_MS);
+      });
+      ["playing", "pause", "loadstart"].forEach(ev => player.on(ev, () => clearTimeout(stallTimer)));
+    }
+    // Cached servers arrive as a flat list, grouped by quality and ranked fastest-first
+    const links = {};
+    relayEnabled = !!data.relay;
+    if (data.status === "cached" && data.servers) {
+      for (const s of data.servers) (links[s.quality] = links[s.quality] || []).push(s);
+      statusDiv.innerText = "✅ Cached links loaded";
+    } else if (data.status === "master" && data.links) {
+      statusDiv.innerText = "⚠️ Only master links found. Click 'Force Scrape' to get direct links.";
+      for (const [quality, masterUrl] of Object.entries(data.links)) {
+        const btn = document.createElement("button");
+        btn.innerText = `${quality}p (Master)`;
+        btn.onclick = () => {
+          currentLink = masterUrl;
+          currentOrigin = masterUrl;
+          currentFallbacks = [];
+          currentQuality = null;
+          player.src({ src: masterUrl, type: "video/mp4" });
+          player.ready(() => player.play());
+        };
+        serversDiv.appendChild(btn);
+      }
+      return;
+    } else {
+      statusDiv.innerText = "💢 No links found";
+      return;
+    }
+    let hasAnyServers = false;
+    for (const [quality, servers] of Object.entries(links)) {
+      for (const server of servers) {
+        const link = server.url;
+        if (!link) continue;
+
+        hasAnyServers = true;
+        const btn = document.createElement("button");
+        btn.innerText = `${quality}p (${server.host})` + (server.score != null ? ` ⚡${server.score}s` : "");
+        if (server.ttfb_ms != null) btn.title = `TTFB ${server.ttfb_ms} ms, ${server.kbps || "?"} kbps`;
+        btn.dataset.link = link;
+        btn.onclick = () => {
+          document.querySelectorAll('.servers button').forEach(b => b.classList.remove('active'));
+          btn.classList.add('active');
+          selectServer(server, quality);
+          player.ready(() => player.play().catch(e => {
+            console.error("Play error:", e);
+            statusDiv.innerText = "💢 Failed to play. Try another server.";
+          }));
+        };
+        serversDiv.appendChild(btn);
+      }
+      for (const server of servers) {
+        if (!server.url) continue;
+        const a = document.createElement("a");
+        a.href = server.fallback || server.url;  // downloads may start later than the resolved URL lives
+        a.innerText = `${quality}p (${server.host})`;
+        a.className = "btn";
+        a.setAttribute("download", "");
+        a.target = "_blank";
+        downloadsDiv.appendChild(a);
+      }
+    }
+    if (hasAnyServers) {
+      const qualityOrder = ["1080", "720", "480"];
+      for (const q of qualityOrder) {
+        if (links[q] && links[q].length > 0) {
+          // Servers arrive ranked fastest-first, so the first one is the best mirror
+          const firstServer = links[q][0].url;
+          if (firstServer) {
+            selectServer(links[q][0], q);
+            const firstBtn = Array.from(serversDiv.querySelectorAll('button')).find(b => b.dataset.link === firstServer);
+            if (firstBtn) firstBtn.classList.add('active');
+            statusDiv.innerText = `✅ Ready to play ${q}p`;
+            break;
+          }
+        }
+      }
+    } else {
+      statusDiv.innerText = "💢 No playable servers found";
+    }
+  } catch (err) {
+    console.error("Load error:", err);
+    document.getElementById("status").innerHTML = `💢 Error: ${err.message}`;
+  }
+}
+
+function selectServer(server, quality) {
+  // server.url may be a pre-resolved redirect target; server.fallback is then the stored link
+  currentLink = server.url;
+  currentOrigin = server.fallback || server.url;
+  currentFallbacks = server.fallback ? [server.fallback] : [];
+  currentQuality = quality;
+  let src = server.url;
+  if (relayEnabled) {
+    const params = new URLSearchParams(window.location.search);
+    const relayParams = new URLSearchParams({
+      show: params.get("show"), ep: params.get("ep"), quality: quality, url: currentOrigin
+    });
+    src = `/relay?${relayParams}`;
+    currentFallbacks.unshift(server.url);
+  }
+  player.src({ src: src, type: "video/mp4" });
+}
+
+function reportPlayback(kind) {
+  // Batched failure beacons: enough reports from different viewers evict the server
+  if (!currentOrigin || !currentQuality) return;
+  const key = `${kind}|${currentOrigin}`;
+  if (reportedLinks.has(key)) return;
+  reportedLinks.add(key);
+  const params = new URLSearchParams(window.location.search);
+  beaconQueue.push({
+    show: params.get("show"), ep: params.get("ep"),
+    quality: currentQuality, url: currentOrigin, kind: kind
+  });
+  if (!beaconTimer) beaconTimer = setTimeout(flushBeacons, 5000);
+}
+
+function flushBeacons() {
+  clearTimeout(beaconTimer);
+  beaconTimer = null;
+  if (!beaconQueue.length) return;
+  const body = JSON.stringify({ events: beaconQueue.splice(0) });
+  if (!(navigator.sendBeacon && navigator.sendBeacon("/beacon", body))) {
+    fetch("/beacon", { method: "POST", body: body, keepalive: true }).catch(() => {});
+  }
+}
+
+function openDirect() {
+  if (currentLink) window.open(currentLink, "_blank");
+  else alert("No video selected");
+}
+
+function openVLC() {
+  if (currentLink) window.location.href = "vlc://" + currentLink;
+  else alert("No video selected");
+}
+
+async function forceScrap() {
+  const params = new URLSearchParams(window.location.search);
+  const show = params.get("show");
+  const ep = params.get("ep");
+  if (!show || !ep) {
+    alert("Missing show/ep parameters");
+    return;
+  }
+
+  document.getElementById("status").innerText = "🔄 Scraping...";
+
+  try {
+    const res = await fetch(`/scrape?show=${encodeURIComponent(show)}&ep=${encodeURIComponent(ep)}`);
+    const data = await res.json();
+
+    if (data.status === "queued") {
+      document.getElementById("status").innerText = "⏳ Scraping queued...";
+      watchScrape(show, ep);
+    } else if (data.status === "cooldown") {
+      // Extract remaining time safely with null check
+      const remainingTimeMatch = data.message.match(/(\d+\.\d+) minutes/);
+      const remainingTime = remainingTimeMatch ? parseFloat(remainingTimeMatch[1]) : 10;
+      showCooldownPopup(remainingTime);
+      document.getElementById("status").innerText = "⏳ " + data.message;
+    } else if (data.status === "already_queued") {
+      document.getElementById("status").innerText = "⏳ " + data.message;
+      watchScrape(show, ep);
+    } else if (data.status === "busy") {
+      document.getElementById("status").innerText = "🚦 " + data.message;
+    } else {
+      document.getElementById("status").innerText = "❌ Scraping failed";
+      alert("Scraping failed: " + (data.message || "Unknown error"));
+    }
+  } catch (err) {
+    console.error("Scrape error:", err);
+    document.getElementById("status").innerText = "❌ Scraping error";
+    alert("Scraping error: " + err.message);
+  }
+}
+
+function watchScrape(show, ep) {
+  // Live progress from the queue worker; reload links as each quality finishes
+  if (scrapeEvents) scrapeEvents.close();
+  if (!window.EventSource) {
+    setTimeout(() => loadEpisode(), 30000);
+    return;
+  }
+  const statusDiv = document.getElementById("status");
+  const es = new EventSource(`/scrape/events?show=${encodeURIComponent(show)}&ep=${encodeURIComponent(ep)}`);
+  scrapeEvents = es;
+  es.addEventListener("queued", e => {
+    const d = JSON.parse(e.data);
+    // Scrapes forwarded to another worker have no known position yet
+    statusDiv.innerText = d.position == null ? "⏳ Scrape queued..." : `⏳ Scrape queued (position ${d.position})...`;
+  });
+  es.addEventListener("started", e => {
+    const d = JSON.parse(e.data);
+    statusDiv.innerText = `🔄 Scraping ${d.qualities.map(q => q + "p").join(", ")}...`;
+  });
+  es.addEventListener("quality", async e => {
+    const d = JSON.parse(e.data);
+    await loadEpisode();
+    statusDiv.innerText = d.remaining.length
+      ? `✅ ${d.quality}p ready (${d.servers} servers), still scraping ${d.remaining.map(q => q + "p").join(", ")}...`
+      : `✅ ${d.quality}p ready (${d.servers} servers)`;
+  });
+  const finish = () => { es.close(); scrapeEvents = null; loadEpisode(); };
+  es.addEventListener("done", finish);
+  es.addEventListener("idle", finish);
+  es.addEventListener("failed", e => {
+    es.close();
+    scrapeEvents = null;
+    statusDiv.innerText = "❌ Scraping failed: " + JSON.parse(e.data).message;
+  });
+  es.onerror = () => {
+    // Stream dropped (proxy timeout etc.) - fall back to a single delayed reload
+    if (scrapeEvents !== es) return;
+    es.close();
+    scrapeEvents = null;
+    setTimeout(() => loadEpisode(), 30000);
+  };
+}
+
+function refreshPage() {
+  window.location.reload();
+}
+
+window.addEventListener('DOMContentLoaded', loadEpisode);
+window.addEventListener('pagehide', flushBeacons);
@@ -3,13 +3,13 @@ import asyncio
 import logging
 # auto_scraper.py - Fix datetime imports and usage
 from datetime import datetime, timezone
-from db import episodes_collection, cache_collection, set_cached, get_episode
-from scraper import scrape_vcloud
+from db import episodes_collection, cache_collection
+from links import count_servers, cache_records, MIN_SERVERS_REQUIRED
+from refresh import refresh_episode
 
 logger = logging.getLogger("auto_scraper")
 
 CHECK_INTERVAL = 300  # Check every 5 minutes
-MIN_SERVERS_REQUIRED = 9
 CACHE_TTL = 3600 # 6 hours cache (instead of 1 hour)
 
 class SimpleAutoScraper:
@@ -23,7 +23,12 @@ class SimpleAutoScraper:
         """Find episodes with expired cache"""
         expired_episodes = []
         
-        cursor = episodes_collection.find({})
+        # Bulk-imported episodes carry a staggered scrapeAfter; skip them until it is due
+        now = datetime.now(timezone.utc)
+        cursor = episodes_collection.find(
+            {"$or": [{"scrapeAfter": {"$exists": False}}, {"scrapeAfter": {"$lte": now}}]},
+            {"_id": 1}
+        )
         async for episode_doc in cursor:
             episode_id = episode_doc["_id"]
             
@@ -43,38 +48,17 @@ class SimpleAutoScraper:
 
 
     async def auto_scrape_episode(self, episode_id: str):
-        """Auto-scrape a single expired episode"""
+        """Auto-refresh a single expired episode (revalidate cache, scrape only what is missing)"""
         try:
             logger.info(f"Auto-scraping expired episode: {episode_id}")
             
-            episode_doc = await get_episode(episode_id)
-            if not episode_doc:
+            results = await refresh_episode(episode_id, mode="incremental", ttl=CACHE_TTL)
+            if not results:
                 return False
             
-            master_links = episode_doc.get("master", {})
-            if not master_links:
-                return False
-            
-            scraped_results = {}
-            total_servers = 0
-            
-            for quality, vcloud_url in master_links.items():
-                try:
-                    servers = await scrape_vcloud(vcloud_url)
-                    if servers:
-                        scraped_results[quality] = servers
-                        total_servers += len(servers)
-                        logger.info(f"Auto-scraped {quality}p: {len(servers)} servers")
-                    else:
-                        scraped_results[quality] = {}
-                except Exception as e:
-                    logger.error(f"Failed to auto-scrape {quality}p: {e}")
-                    scraped_results[quality] = {}
-            
-            if scraped_results:
-                await set_cached(episode_id, scraped_results, ttl=CACHE_TTL)
-                logger.info(f"Auto-scrape completed for {episode_id}: {total_servers} servers")
-                return True
+            total_servers = sum(len(servers) for servers in results.values())
+            logger.info(f"Auto-scrape completed for {episode_id}: {total_servers} servers")
+            return True
             
         except Exception as e:
             logger.exception(f"Auto-scrape failed for {episode_id}: {e}")
@@ -119,21 +103,14 @@ class SimpleAutoScraper:
 auto_scraper = SimpleAutoScraper()
 
 
-async def count_servers_in_links(links_dict):
-    """Count total servers in cached links"""
-    if not links_dict:
-        return 0
-    total = 0
-    for quality, servers in links_dict.items():
-        if isinstance(servers, dict):
-            total += len(servers)
-    return total
-
-
 async def check_episode_servers(episode_id: str):
     """Check if episode has enough servers"""
     cache_doc = await cache_collection.find_one({"_id": episode_id})
-    
+    return server_info_from_cache(cache_doc)
+
+
+def server_info_from_cache(cache_doc):
+    """Server-count info for an already-fetched cache doc"""
     if not cache_doc:
         return {
             "server_count": 0,
@@ -141,8 +118,7 @@ async def check_episode_servers(episode_id: str):
             "message": "No cached servers found. Please use Force Scrape."
         }
     
-    links = cache_doc.get("links", {})
-    server_count = await count_servers_in_links(links)
+    server_count = count_servers(cache_records(cache_doc))
     
     if server_count < MIN_SERVERS_REQUIRED:
         return {
@@ -155,4 +131,30 @@ async def check_episode_servers(episode_id: str):
         "server_count": server_count,
         "needs_force_scrape": False,
         "message": f"{server_count} servers available"
+    }
+
+
+def summarize_episode(episode_doc, cache_doc, now=None):
+    """Compact link status of one episode from already-fetched docs (no DB access)"""
+    if not episode_doc:
+        return {"status": "missing"}
+
+    now = now or datetime.now(timezone.utc)
+    per_quality = {}
+    for rec in cache_records(cache_doc):
+        per_quality[rec["quality"]] = per_quality.get(rec["quality"], 0) + 1
+    server_count = sum(per_quality.values())
+
+    if not cache_doc:
+        status = "master"
+    elif cache_doc.get("expireAt") and cache_doc["expireAt"] <= now:
+        status = "stale"
+    else:
+        status = "cached"
+
+    return {
+        "status": status,
+        "servers": server_count,
+        "qualities": per_quality or {q: 0 for q in episode_doc.get("master", {})},
+        "needs_force_scrape": server_count < MIN_SERVERS_REQUIRED,
     }
\ No newline at end of file
@@ -0,0 +1,103 @@
+# beacons.py - Player playback-failure beacons -> targeted invalidation of dead servers
+import os
+import time
+
+from links import canonical_url
+from scrape_queue import ExpiringDict
+
+BEACON_MIN_CLIENTS = int(os.getenv("BEACON_MIN_CLIENTS", 3))        # distinct clients before eviction
+BEACON_WINDOW_SECONDS = int(os.getenv("BEACON_WINDOW_SECONDS", 900))
+BEACON_RATE_PER_MINUTE = int(os.getenv("BEACON_RATE_PER_MINUTE", 10))
+# Only behind a proxy that appends X-Forwarded-For (e.g. Koyeb); otherwise clients could pick their IP
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "0") == "1"
+MAX_EVENTS_PER_BATCH = 20
+MAX_TRACKED = 20000
+
+BEACON_KINDS = ("error", "stall")
+
+
+class BeaconTracker:
+    """
+    Counts distinct clients reporting the same broken server. Each client is
+    rate limited with a token bucket; once BEACON_MIN_CLIENTS distinct clients
+    report a server within the window, it is returned once for eviction.
+    """
+
+    def __init__(self):
+        self._buckets = ExpiringDict(120, MAX_TRACKED)                    # client -> (tokens, last refill)
+        self._reports = ExpiringDict(BEACON_WINDOW_SECONDS, MAX_TRACKED)  # (ep, quality, url) -> set(clients)
+        self._evicted = ExpiringDict(BEACON_WINDOW_SECONDS, MAX_TRACKED)  # recently evicted keys
+        self.accepted = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def allow(self, client: str) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (float(BEACON_RATE_PER_MINUTE), now))
+        tokens = min(BEACON_RATE_PER_MINUTE, tokens + (now - last) * BEACON_RATE_PER_MINUTE / 60)
+        if tokens < 1:
+            self._buckets.set(client, (tokens, now))
+            self.rejected += 1
+            return False
+        self._buckets.set(client, (tokens - 1, now))
+        self.accepted += 1
+        return True
+
+    def report(self, client: str, ep_id: str, quality: str, url: str) -> bool:
+        """Record one failure report; True when this server just crossed the eviction threshold"""
+        key = (ep_id, str(quality), canonical_url(url))
+        if key in self._evicted:
+            return False
+        clients = self._reports.get(key) or set()
+        clients.add(client)
+        self._reports.set(key, clients)
+        if len(clients) < BEACON_MIN_CLIENTS:
+            return False
+        self._reports.pop(key)
+        self._evicted.set(key, True)
+        self.evictions += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rate_limited": self.rejected,
+            "evictions": self.evictions,
+            "pending_servers": len(self._reports),
+        }
+
+
+def client_address(request) -> str:
+    """Address distinct clients are counted by: the proxy-appended (right-most) X-Forwarded-For
+    hop when TRUST_FORWARDED_FOR=1, else the socket peer"""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for", "").split(",")[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+def parse_beacon_events(payload) -> list:
+    """Validate a beacon batch; returns [(ep_id, quality, url, kind)]"""
+    events = payload.get("events") if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        return []
+    parsed = []
+    for event in events[:MAX_EVENTS_PER_BATCH]:
+        if not isinstance(event, dict):
+            continue
+        show, ep = event.get("show"), event.get("ep")
+        quality, url = event.get("quality"), event.get("url")
+        kind = event.get("kind", "error")
+        if not (show and quality and isinstance(url, str) and url.startswith("http")):
+            continue
+        if not str(ep).isdigit():
+            continue
+        if kind not in BEACON_KINDS:
+            continue
+        parsed.append((f"{show}:{int(ep)}", str(quality), url, kind))
+    return parsed
+
+
+# Global instance
+beacon_tracker = BeaconTracker()
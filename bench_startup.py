@@ -0,0 +1,113 @@
+# bench_startup.py - Cold-start budget for the API process: import time and time to first /get_link
+#
+#   python bench_startup.py                      # 5 import runs + 1 cold boot
+#   python bench_startup.py --runs 10 --record startup.jsonl
+#
+# Every run is a fresh interpreter, so results reflect what Koyeb scale-from-zero pays.
+# --record appends one JSON line per invocation (tagged with the git commit) to compare changes.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+HEAVY_MODULES = ("playwright.async_api", "aiohttp", "motor.motor_asyncio", "fastapi", "brotli")
+
+
+def measure_import(module: str = "server") -> dict:
+    """Wall time of `import module` in a fresh interpreter, plus which heavy modules it pulled in"""
+    code = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(path: str, timeout: float) -> dict:
+    """Spawn uvicorn and time until `path` answers (any HTTP status counts as served)"""
+    port = _free_port()
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env
+    )
+    status = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as resp:
+                    status = resp.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.05)
+                continue
+            break
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return {"seconds": round(elapsed, 3) if status else None, "status": status}
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh-interpreter import runs")
+    parser.add_argument("--path", default="/get_link?show=bench&ep=1", help="first request to time")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--skip-server", action="store_true", help="only measure import time")
+    parser.add_argument("--record", help="append the result as a JSON line to this file")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    seconds = [r["seconds"] for r in imports]
+    result = {
+        "commit": _git_commit(),
+        "at": datetime.now(timezone.utc).isoformat(),
+        "import_seconds": {
+            "median": round(statistics.median(seconds), 3),
+            "min": round(min(seconds), 3),
+            "max": round(max(seconds), 3),
+        },
+        "heavy_modules_at_import": imports[-1]["loaded"],
+    }
+    if not args.skip_server:
+        result["first_request"] = {"path": args.path, **measure_first_request(args.path, args.timeout)}
+
+    print(json.dumps(result, indent=2))
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
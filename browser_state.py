@@ -0,0 +1,58 @@
+# browser_state.py - Per-host Playwright storage state (cookies/localStorage) reused across scrapes
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from db import browser_state_collection
+from links import link_host
+
+logger = logging.getLogger("browser_state")
+
+STATE_TTL = int(os.getenv("BROWSER_STATE_TTL", 6 * 3600))
+MAX_STATE_BYTES = 256 * 1024   # don't persist hosts that stuff megabytes into localStorage
+
+# hits/misses: contexts seeded or not; clicks_skipped: seeded pages that already showed links
+stats = {"hits": 0, "misses": 0, "saves": 0, "clicks_skipped": 0}
+
+
+async def load(url: str):
+    """Stored storage_state for url's host (Playwright new_context format), or None"""
+    try:
+        doc = await browser_state_collection.find_one({"_id": link_host(url)})
+    except Exception as e:
+        logger.warning(f"Browser state lookup failed: {e}")
+        doc = None
+    if doc and doc.get("expireAt") and doc["expireAt"] > datetime.now(timezone.utc):
+        stats["hits"] += 1
+        return doc["state"]
+    stats["misses"] += 1
+    return None
+
+
+async def save(url: str, state: dict):
+    """Persist state captured after a successful scrape of url"""
+    size = sum(len(c.get("value", "")) for c in state.get("cookies", ())) + sum(
+        len(i.get("value", "")) for o in state.get("origins", ()) for i in o.get("localStorage", ()))
+    if size > MAX_STATE_BYTES:
+        logger.info(f"Not saving {size} bytes of browser state for {link_host(url)}")
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        await browser_state_collection.update_one(
+            {"_id": link_host(url)},
+            {"$set": {"state": state, "savedAt": now, "expireAt": now + timedelta(seconds=STATE_TTL)}},
+            upsert=True
+        )
+        stats["saves"] += 1
+    except Exception as e:
+        logger.warning(f"Browser state save failed: {e}")
+
+
+async def forget(url: str):
+    """Drop a host's state (e.g. it stopped producing links)"""
+    await browser_state_collection.delete_one({"_id": link_host(url)})
+
+
+def snapshot() -> dict:
+    seeded = stats["hits"] + stats["misses"]
+    return {**stats, "hit_rate": round(stats["hits"] / seeded, 2) if seeded else None}
@@ -0,0 +1,104 @@
+# bulk_import.py - Streamed CSV / JSON-lines episode import with staged scrape scheduling
+import codecs
+import csv
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+QUALITIES = ("480", "720", "1080")
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 200))
+# Initial scrapes are spread out so an import never becomes a thundering herd
+IMPORT_SCRAPES_PER_HOUR = int(os.getenv("IMPORT_SCRAPES_PER_HOUR", 30))
+MAX_REPORTED_ERRORS = 50
+
+
+class InvalidRow(ValueError):
+    """A line that cannot be imported (reported back, never fatal)"""
+
+
+def valid_master_url(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.hostname)
+
+
+def _row_to_entry(show, ep, master: dict) -> dict:
+    if not isinstance(show, str) or not show.strip() or ":" in show:
+        raise InvalidRow("show is required, must be text and must not contain ':'")
+    show = show.strip()
+    try:
+        ep = int(str(ep).strip())
+    except ValueError:
+        raise InvalidRow(f"ep must be a number, got {ep!r}")
+
+    if not isinstance(master, dict):
+        raise InvalidRow("master must be an object of {quality: url}")
+    clean = {}
+    for quality, url in master.items():
+        url = str(url or "").strip()
+        if not url:
+            continue
+        if not valid_master_url(url):
+            raise InvalidRow(f"invalid {quality}p master URL: {url[:80]}")
+        clean[str(quality)] = url
+    if not clean:
+        raise InvalidRow("need at least one master link")
+    return {"ep_id": f"{show}:{ep}", "show": show, "ep": ep, "master": clean}
+
+
+def parse_line(line: str, fmt: str, header=None) -> dict:
+    """One CSV (show,ep,link480,link720,link1080) or JSON line -> entry dict"""
+    if fmt == "jsonl":
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise InvalidRow("invalid JSON")
+        if not isinstance(row, dict):
+            raise InvalidRow("each line must be a JSON object")
+        master = row.get("master") or {q: row.get(q) or row.get(f"link{q}") for q in QUALITIES}
+        return _row_to_entry(row.get("show"), row.get("ep", row.get("episode")), master)
+
+    values = next(csv.reader([line]))
+    if header:
+        row = dict(zip(header, values))
+    else:
+        row = dict(zip(["show", "ep"] + [f"link{q}" for q in QUALITIES], values))
+    master = {q: row.get(f"link{q}") or row.get(q) for q in QUALITIES}
+    return _row_to_entry(row.get("show"), row.get("ep", row.get("episode")), master)
+
+
+async def iter_lines(chunks):
+    """Split a streamed (possibly chunk-split, utf-8) upload into lines without buffering it all"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def detect_format(first_line: str, content_type: str = "") -> str:
+    if "json" in content_type or first_line.lstrip().startswith("{"):
+        return "jsonl"
+    return "csv"
+
+
+def _spacing() -> timedelta:
+    return timedelta(seconds=3600 / max(IMPORT_SCRAPES_PER_HOUR, 1))
+
+
+def scrape_schedule(start: datetime, offset: int, count: int):
+    """scrapeAfter times for entries offset..offset+count, IMPORT_SCRAPES_PER_HOUR apart"""
+    return [start + _spacing() * (offset + i) for i in range(count)]
+
+
+def schedule_start(latest_scheduled) -> datetime:
+    """Continue after any previous import's queue instead of overlapping it"""
+    now = datetime.now(timezone.utc)
+    if latest_scheduled and latest_scheduled > now:
+        return latest_scheduled + _spacing()
+    return now
@@ -1,7 +1,16 @@
 # db.py
 import motor.motor_asyncio
 import os
+import logging
+import math
 from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from links import (
+    canonical_url, server_record, merge_records, legacy_records, cache_records, servers_by_quality,
+    MIN_SERVERS_REQUIRED
+)
+from mirror_stats import mirror_stats
+from redirects import redirect_cache
 
 MONGO_URI = os.getenv(
     "MONGO_URI",
@@ -19,54 +28,422 @@ db = client[DB_NAME]
 episodes_collection = db["episodes"]   # permanent episode records (master links)
 cache_collection = db["cache"]         # temporary scraped links (expire in ~1hr)
 jobs_collection = db["jobs"]           # track transcoding jobs (progress, credits, status)
+hits_collection = db["hits"]           # decayed view counters + next-episode hints (drive prefetch)
+linkcache_collection = db["linkcache"] # scrape results keyed by normalized master URL (shared by episodes)
+locks_collection = db["locks"]         # leader lease for background scrapers
+scrape_requests_collection = db["scrape_requests"]  # scrapes forwarded by non-leader workers
+scrape_status_collection = db["scrape_status"]      # latest scrape progress event per episode (cross-worker SSE)
+browser_state_collection = db["browser_state"]      # per-host Playwright cookies/localStorage
+show_health_collection = db["show_health"]          # per-show link health summary (kept current on every write)
+
+HIT_HALF_LIFE = float(os.getenv("HIT_HALF_LIFE_HOURS", 24)) * 3600
+HIT_DECAY_PER_SECOND = math.log(2) / HIT_HALF_LIFE
+# `rank` = log of the hit score normalized to this fixed epoch: it sorts like the decayed score
+# at any moment without being decayed (every score decays at the same rate)
+HIT_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HIT_TTL = int(os.getenv("HIT_TTL_DAYS", 14)) * 86400   # hits docs untouched this long are dropped
+
+# Expired cache docs are kept this long (stale links are still revalidated), then Mongo drops them
+CACHE_STALE_GRACE = int(os.getenv("CACHE_STALE_GRACE_SECONDS", 3 * 86400))
+BACKFILL_BATCH = 500
+
+logger = logging.getLogger("db")
+
+
+def split_episode_id(ep_id: str):
+    """'show:ep' -> (show, ep); ep is an int when numeric"""
+    show, _, ep = ep_id.rpartition(":")
+    return show, int(ep) if ep.isdigit() else ep
+
+
+def _health_counters() -> dict:
+    """Pipeline stage recomputing a show's stored episode count from its per-episode entries"""
+    # Cache-dependent counts are derived at read time (get_show_health): Mongo's TTL drops
+    # cache docs without any write we could hook
+    return {"$set": {"episodes": {"$size": {"$objectToArray": "$eps"}}}}
+
+
+async def update_show_health(show: str, entries: dict = None, keep_existing: bool = False,
+                             only_tracked: bool = False, remove=()):
+    """
+    Apply episode changes to a show's health doc in one atomic update.
+    entries: {ep: {"n": server count, "exp": cache expireAt or None}}; with
+    keep_existing only episodes not yet tracked are added (new episodes), with
+    only_tracked only episodes already tracked are updated (cache writes, so a
+    scrape finishing after remove_episode does not bring the episode back).
+    Only the touched show is rewritten; cache-derived counts are resolved at read time.
+    """
+    eps = {"$ifNull": ["$eps", {}]}
+    if remove:
+        keys = [str(ep) for ep in remove]
+        eps = {"$arrayToObject": {"$filter": {
+            "input": {"$objectToArray": eps}, "cond": {"$not": [{"$in": ["$$this.k", keys]}]}
+        }}}
+    if entries:
+        new = {"$literal": {str(ep): entry for ep, entry in entries.items()}}
+        if only_tracked:
+            tracked = {"$map": {"input": {"$objectToArray": eps}, "as": "e", "in": "$$e.k"}}
+            new = {"$arrayToObject": {"$filter": {
+                "input": {"$objectToArray": new}, "cond": {"$in": ["$$this.k", tracked]}
+            }}}
+        eps = {"$mergeObjects": [new, eps] if keep_existing else [eps, new]}
+    try:
+        await show_health_collection.update_one(
+            {"_id": show},
+            [{"$set": {"eps": eps, "updatedAt": datetime.now(timezone.utc)}}, _health_counters()],
+            upsert=not only_tracked
+        )
+    except Exception as e:
+        # Derived data - never fail the write it mirrors (POST /admin/health/rebuild repairs drift)
+        logger.warning(f"Show health update failed for {show}: {e}")
+
+
+async def _track_cache(ep_id: str, cache_doc):
+    show, ep = split_episode_id(ep_id)
+    entry = {"n": len(cache_records(cache_doc)), "exp": cache_doc.get("expireAt")} if cache_doc else {"n": 0, "exp": None}
+    await update_show_health(show, {ep: entry}, only_tracked=True)
+
+
+async def rebuild_show_health(force: bool = False) -> int:
+    """
+    Build the summary from the episodes and cache collections. At startup
+    (force=False) only when it is empty, e.g. first deploy; force=True
+    reconciles an existing summary, replacing every show's entries.
+    """
+    if not force and await show_health_collection.estimated_document_count():
+        return 0
+    shows = {}
+    async for doc in episodes_collection.find({}, {"show": 1, "ep": 1}):
+        show, ep = (doc["show"], doc["ep"]) if "show" in doc else split_episode_id(doc["_id"])
+        shows.setdefault(show, {})[ep] = {"n": 0, "exp": None}
+    async for doc in cache_collection.find({}, {"servers.url": 1, "links": 1, "expireAt": 1}):
+        show, ep = split_episode_id(doc["_id"])
+        if ep in shows.get(show, {}):
+            shows[show][ep] = {"n": len(cache_records(doc)), "exp": doc.get("expireAt")}
+    now = datetime.now(timezone.utc)
+    for show, entries in shows.items():
+        await show_health_collection.update_one(
+            {"_id": show},
+            [{"$set": {"eps": {"$literal": {str(ep): e for ep, e in entries.items()}}, "updatedAt": now}},
+             _health_counters()],
+            upsert=True
+        )
+    # Shows whose episodes are all gone
+    await show_health_collection.delete_many({"_id": {"$nin": list(shows)}})
+    if shows:
+        logger.info(f"Built health summary for {len(shows)} shows")
+    return len(shows)
+
+
+async def get_show_health(now=None) -> list:
+    """
+    Per-show summary read from show_health (one doc per show): episode counts
+    by state, under-served episodes, next cache expiry and average servers.
+    """
+    now = now or datetime.now(timezone.utc)
+    gone = now - timedelta(seconds=CACHE_STALE_GRACE)   # Mongo has dropped cache docs expired before this
+    entries = {"$objectToArray": "$eps"}
+    # Cached = its cache doc still exists (fresh or stale); only these count towards servers
+    cached = {"$filter": {"input": entries, "cond": {"$gt": ["$$this.v.exp", gone]}}}
+    fresh = {"$filter": {"input": entries, "cond": {"$gt": ["$$this.v.exp", now]}}}
+    cursor = show_health_collection.aggregate([
+        {"$project": {
+            "_id": 0, "show": "$_id", "episodes": 1, "updatedAt": 1,
+            "cached": {"$size": cached},
+            "fresh": {"$size": fresh},
+            "servers": {"$sum": {"$map": {"input": cached, "in": "$$this.v.n"}}},
+            "underServed": {"$size": {"$filter": {
+                "input": cached, "cond": {"$lt": ["$$this.v.n", MIN_SERVERS_REQUIRED]}
+            }}},
+            "nextExpiry": {"$min": {"$map": {"input": fresh, "in": "$$this.v.exp"}}},
+        }},
+        {"$sort": {"show": ASCENDING}},
+    ])
+    shows = []
+    async for doc in cursor:
+        servers, cached = doc.pop("servers"), doc["cached"]
+        doc["stale"] = cached - doc["fresh"]
+        doc["missing"] = doc.get("episodes", 0) - cached
+        doc["avgServers"] = round(servers / cached, 1) if cached else 0
+        shows.append(doc)
+    return shows
 
 
 async def add_episode(ep_id: str, master_links: dict):
+    show, ep = split_episode_id(ep_id)
     await episodes_collection.update_one(
         {"_id": ep_id},
-        {"$set": {"master": master_links, "createdAt": datetime.now(timezone.utc)}},  # ✅ FIXED
+        {"$set": {"master": master_links, "show": show, "ep": ep, "createdAt": datetime.now(timezone.utc)}},  # ✅ FIXED
         upsert=True
     )
+    await update_show_health(show, {ep: {"n": 0, "exp": None}}, keep_existing=True)
+
+
+async def remove_episode(ep_id: str) -> int:
+    show, ep = split_episode_id(ep_id)
+    result = await episodes_collection.delete_one({"_id": ep_id})
+    if result.deleted_count:
+        await update_show_health(show, remove=[ep])
+    return result.deleted_count
+
+
+async def bulk_add_episodes(entries: list, scrape_after: list, job_id: str) -> int:
+    """Upsert a batch of episodes in one bulk_write; scrape_after staggers their first scrape"""
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne(
+            {"_id": entry["ep_id"]},
+            {"$set": {
+                "master": entry["master"], "show": entry["show"], "ep": entry["ep"],
+                "createdAt": now, "scrapeAfter": when, "importJob": job_id
+            }},
+            upsert=True
+        )
+        for entry, when in zip(entries, scrape_after)
+    ]
+    result = await episodes_collection.bulk_write(ops, ordered=False)
+
+    by_show = {}
+    for entry in entries:
+        by_show.setdefault(entry["show"], {})[entry["ep"]] = {"n": 0, "exp": None}
+    for show, new_eps in by_show.items():
+        await update_show_health(show, new_eps, keep_existing=True)
+    return result.upserted_count + result.matched_count
+
+
+async def latest_scrape_after():
+    """Latest scheduled first-scrape time (so a new import queues behind it)"""
+    doc = await episodes_collection.find_one(
+        {"scrapeAfter": {"$gt": datetime.now(timezone.utc)}},
+        {"scrapeAfter": 1},
+        sort=[("scrapeAfter", -1)]
+    )
+    return doc["scrapeAfter"] if doc else None
+
+
+async def _ensure_ttl_index(collection, field: str, seconds: int):
+    """
+    TTL index on `field`. An existing index on the same key (e.g. one created by
+    hand with other options) is adjusted in place instead of conflicting.
+    """
+    for name, spec in (await collection.index_information()).items():
+        if [key for key, _ in spec["key"]] != [field]:
+            continue
+        if spec.get("expireAfterSeconds") == seconds:
+            return
+        if "expireAfterSeconds" in spec:
+            await db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": seconds})
+            logger.info(f"Changed TTL of {collection.name}.{name} to {seconds}s")
+            return
+        await collection.drop_index(name)   # plain index on the field: replace it with the TTL one
+        break
+    await collection.create_index(field, name=f"{field}_ttl", expireAfterSeconds=seconds)
+
+
+async def ensure_indexes():
+    """Create indexes (idempotent - safe on every startup)"""
+    await episodes_collection.create_index([("show", ASCENDING), ("ep", ASCENDING)], name="show_ep")
+    await episodes_collection.create_index("scrapeAfter", name="scrapeAfter", sparse=True)
+    await episodes_collection.create_index("importJob", name="importJob", sparse=True)
+    await _ensure_ttl_index(cache_collection, "expireAt", CACHE_STALE_GRACE)
+    await _ensure_ttl_index(linkcache_collection, "expireAt", 0)
+    await scrape_requests_collection.create_index("createdAt", name="createdAt")
+    await _ensure_ttl_index(scrape_status_collection, "updatedAt", 86400)
+    await _ensure_ttl_index(browser_state_collection, "expireAt", 0)
+    await _ensure_ttl_index(hits_collection, "expireAt", 0)
+    await hits_collection.create_index("rank", name="rank", sparse=True)
+
+
+async def backfill_episode_fields() -> int:
+    """Migration: add show/ep fields to episodes created before they existed"""
+    updated = 0
+    batch = []
+    async for doc in episodes_collection.find({"show": {"$exists": False}}, {"_id": 1}):
+        show, ep = split_episode_id(doc["_id"])
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"show": show, "ep": ep}}))
+        if len(batch) >= BACKFILL_BATCH:
+            updated += (await episodes_collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await episodes_collection.bulk_write(batch, ordered=False)).modified_count
+    if updated:
+        logger.info(f"Backfilled show/ep on {updated} episodes")
+    return updated
+
+
+async def backfill_hit_expiry() -> int:
+    """Migration: give hits docs written before HIT_TTL an expireAt so the TTL index drops them"""
+    now = datetime.now(timezone.utc)
+    last_seen = {"$ifNull": ["$updatedAt", {"$ifNull": ["$nextHintAt", now]}]}
+    result = await hits_collection.update_many(
+        {"expireAt": {"$exists": False}},
+        [{"$set": {"expireAt": {"$add": [last_seen, HIT_TTL * 1000]}}}]
+    )
+    if result.modified_count:
+        logger.info(f"Backfilled expireAt on {result.modified_count} hits docs")
+    return result.modified_count
+
+
+async def migrate_cache_links() -> int:
+    """Migration: convert {quality: {name: url}} cache docs to deduped `servers` records"""
+    updated = 0
+    batch = []
+    async for doc in cache_collection.find({"servers": {"$exists": False}, "links": {"$exists": True}}):
+        records = legacy_records(doc.get("links"), doc.get("updatedAt"))
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"servers": records}, "$unset": {"links": ""}}))
+        if len(batch) >= BACKFILL_BATCH:
+            updated += (await cache_collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await cache_collection.bulk_write(batch, ordered=False)).modified_count
+    if updated:
+        logger.info(f"Migrated {updated} cache docs to server records")
+    return updated
+
+
+async def search_episodes(show: str, after_ep=None, limit: int = 50):
+    """Keyset-paginated episodes of a show, ordered by ep (projected, streamed from the cursor)"""
+    query = {"show": show}
+    if after_ep is not None:
+        query["ep"] = {"$gt": after_ep}
+    cursor = episodes_collection.find(
+        query, {"master": 1, "show": 1, "ep": 1, "createdAt": 1}
+    ).sort([("show", ASCENDING), ("ep", ASCENDING)]).limit(limit)
+    async for doc in cursor:
+        yield doc
 
 async def get_episode(ep_id: str):
     return await episodes_collection.find_one({"_id": ep_id})
 
 
 async def get_cached(ep_id: str):
-    doc = await cache_collection.find_one({"_id": ep_id})
+    # {quality: {host label: url}} view of the cached server records
+    doc = await cache_collection.find_one({"_id": ep_id}, {"servers": 1, "links": 1, "updatedAt": 1})
     if doc:
-        return doc.get("links")
+        return servers_by_quality(cache_records(doc))
     return None
 
 
-async def set_cached(ep_id: str, links: dict, ttl: int = 3600):
-    # Merge new links with existing ones (append mode)
-    old_doc = await cache_collection.find_one({"_id": ep_id})
-    old_links = old_doc.get("links", {}) if old_doc else {}
-
-    merged = old_links.copy()
-    for quality, servers in links.items():
-        if quality not in merged:
-            merged[quality] = servers
-        else:
-            merged[quality].update(servers)
-    
-    print(f"💾 Merging {ep_id}: {sum(len(v) for v in old_links.values())} -> {sum(len(v) for v in merged.values())} total servers")
-    
-    update_doc = {
-        "links": merged,
-        "updatedAt": datetime.now(timezone.utc),  # Changed from datetime.now(timezone.utc)
-        "expireAt": datetime.now(timezone.utc) + timedelta(seconds=ttl)  # Changed
-    }
-
-    print(f"💾 Caching {ep_id}: {sum(len(v) for v in merged.values())} total servers")
-
-    await cache_collection.update_one(
+async def get_cached_doc(ep_id: str):
+    # Whole cache doc (links + updatedAt/expireAt) in one round trip
+    return await cache_collection.find_one({"_id": ep_id})
+
+
+def _new_records(quality: str, servers: dict, now) -> list:
+    # Scraped {name: url} -> records; the same link under several names is stored once
+    records = merge_records([
+        server_record(quality, url, now, mirror_stats.score(url)) for url in servers.values() if url
+    ])
+    for rec in records:
+        # Where validation saw the link redirect to (served instead while fresh)
+        resolved = redirect_cache.lookup(rec["url"])
+        if resolved:
+            rec["resolvedUrl"], rec["resolvedExpireAt"] = resolved
+    return records
+
+
+async def set_cached_quality(ep_id: str, quality: str, servers: dict, ttl: int = 3600, extend: bool = True):
+    # Replace (not merge) one quality's servers - this is how dead servers get pruned.
+    # extend=False never pushes the doc's expireAt later (the other qualities were not revalidated)
+    now = datetime.now(timezone.utc)
+    quality = str(quality)
+    old_doc = await cache_collection.find_one({"_id": ep_id}, {"servers": 1, "links": 1, "updatedAt": 1})
+    if old_doc and "servers" not in old_doc:
+        await migrate_cache_links()
+
+    # Servers that survived revalidation keep the time they were first discovered
+    first_seen = {r["url"]: r["discoveredAt"] for r in cache_records(old_doc) if r["quality"] == quality}
+    records = [
+        dict(rec, discoveredAt=first_seen.get(rec["url"], rec["discoveredAt"]))
+        for rec in _new_records(quality, servers, now)
+    ]
+    print(f"💾 Caching {ep_id} {quality}p: {len(records)} servers (replace)")
+    new_expiry = now + timedelta(seconds=ttl)
+
+    # Pipeline update swaps this quality's records atomically, leaving the others alone
+    doc = await cache_collection.find_one_and_update(
         {"_id": ep_id},
-        {"$set": update_doc},
-        upsert=True
+        [{"$set": {
+            "servers": {"$concatArrays": [
+                {"$filter": {
+                    "input": {"$ifNull": ["$servers", []]},
+                    "cond": {"$ne": ["$$this.quality", quality]}
+                }},
+                {"$literal": records}
+            ]},
+            "updatedAt": now,
+            "expireAt": new_expiry if extend else {"$min": ["$expireAt", new_expiry]}
+        }}],
+        projection={"servers.url": 1, "expireAt": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    await _track_cache(ep_id, doc)
+
+
+async def remove_cached_server(ep_id: str, quality: str, url: str) -> int:
+    # Drop the server of one quality pointing at url; leaves expireAt untouched
+    doc = await cache_collection.find_one_and_update(
+        {"_id": ep_id, "servers": {"$elemMatch": {"quality": str(quality), "url": canonical_url(url)}}},
+        {"$pull": {"servers": {"quality": str(quality), "url": canonical_url(url)}},
+         "$set": {"updatedAt": datetime.now(timezone.utc)}},
+        projection={"servers.url": 1, "expireAt": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        return 0
+    logger.info(f"Evicted dead server from {ep_id} {quality}p")
+    await _track_cache(ep_id, doc)
+    return 1
 
 
 async def delete_cached(ep_id: str):
-    await cache_collection.delete_one({"_id": ep_id})
\ No newline at end of file
+    await cache_collection.delete_one({"_id": ep_id})
+    await _track_cache(ep_id, None)
+
+
+def decayed_score(score: float, updated_at, now=None) -> float:
+    """Value of a stored hit score after exponential decay up to now"""
+    if not score or not updated_at:
+        return 0.0
+    now = now or datetime.now(timezone.utc)
+    return score * math.exp(-HIT_DECAY_PER_SECOND * (now - updated_at).total_seconds())
+
+
+def hit_rank_threshold(score: float, now=None) -> float:
+    """`rank` above which an episode's decayed score exceeds `score` right now"""
+    now = now or datetime.now(timezone.utc)
+    return math.log(score) + HIT_DECAY_PER_SECOND * (now - HIT_EPOCH).total_seconds()
+
+
+async def record_view(show: str, ep: int):
+    """Bump the decayed hit counter of show:ep and hint that show:ep+1 is likely next (if it exists)"""
+    now = datetime.now(timezone.utc)
+    expire_at = now + timedelta(seconds=HIT_TTL)
+    # Decay the stored score to now, then add this hit - done server-side in one update
+    elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updatedAt", now]}]}, 1000]}
+    decay = {"$exp": {"$multiply": [-HIT_DECAY_PER_SECOND, elapsed]}}
+    # rank = ln(exp(rank) + exp(hit)), computed as max + ln(1 + exp(min - max)) to stay finite
+    hit = HIT_DECAY_PER_SECOND * (now - HIT_EPOCH).total_seconds()
+    high, low = {"$max": ["$rank", hit]}, {"$min": ["$rank", hit]}
+    rank = {"$cond": [
+        {"$eq": [{"$ifNull": ["$rank", None]}, None]},
+        hit,
+        {"$add": [high, {"$ln": {"$add": [1, {"$exp": {"$subtract": [low, high]}}]}}]}
+    ]}
+    await hits_collection.update_one(
+        {"_id": f"{show}:{ep}"},
+        [{"$set": {
+            "score": {"$add": [{"$multiply": [{"$ifNull": ["$score", 0]}, decay]}, 1]},
+            "rank": rank,
+            "updatedAt": now,
+            "expireAt": expire_at
+        }}],
+        upsert=True
+    )
+    if await episodes_collection.count_documents({"_id": f"{show}:{ep + 1}"}, limit=1):
+        await hits_collection.update_one(
+            {"_id": f"{show}:{ep + 1}"},
+            {"$set": {"nextHintAt": now}, "$max": {"expireAt": expire_at}},
+            upsert=True
+        )
\ No newline at end of file
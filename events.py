@@ -0,0 +1,60 @@
+# events.py - In-process pub/sub for per-episode scrape progress (feeds the SSE endpoint)
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger("events")
+
+SUBSCRIBER_QUEUE_SIZE = 100
+TERMINAL_EVENTS = ("done", "failed")
+
+
+class EpisodeEvents:
+    """Fan out scrape progress events to every listener of an episode"""
+
+    def __init__(self):
+        self._subscribers = {}   # ep_id -> set of asyncio.Queue
+        self.active = {}         # ep_id -> last non-terminal event (replayed to late subscribers)
+        self._listeners = []     # callables that see every event (e.g. mirroring to Mongo)
+
+    def subscribe(self, ep_id: str) -> asyncio.Queue:
+        q = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(ep_id, set()).add(q)
+        return q
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def unsubscribe(self, ep_id: str, q: asyncio.Queue):
+        subs = self._subscribers.get(ep_id)
+        if subs:
+            subs.discard(q)
+            if not subs:
+                self._subscribers.pop(ep_id, None)
+
+    def publish(self, ep_id: str, event_type: str, **data):
+        event = {"type": event_type, "episode": ep_id, "ts": time.time(), **data}
+        if event_type in TERMINAL_EVENTS:
+            self.active.pop(ep_id, None)
+        else:
+            self.active[ep_id] = event
+
+        for fn in self._listeners:
+            fn(event)
+
+        for q in list(self._subscribers.get(ep_id, ())):
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client; it will still get the final state on reconnect
+                logger.debug(f"Dropping {event_type} event for slow subscriber of {ep_id}")
+
+
+def format_sse(event: dict) -> str:
+    """Encode an event dict as a server-sent-events frame"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+# Global instance
+episode_events = EpisodeEvents()
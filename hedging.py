@@ -0,0 +1,80 @@
+# hedging.py - Per-host HTTP extraction timings that decide when to race the browser path
+import os
+from collections import deque
+
+from links import link_host
+
+HEDGE_MODE = os.getenv("HEDGE_MODE", "off")             # off | auto (uncertain hosts) | always
+HEDGE_DELAY_SECONDS = float(os.getenv("HEDGE_DELAY_SECONDS", 6))   # until a host has a p90
+HEDGE_MIN_DELAY = 1.0
+HEDGE_MAX_DELAY = 15.0
+HEDGE_SUCCESS_THRESHOLD = float(os.getenv("HEDGE_SUCCESS_THRESHOLD", 0.8))
+MIN_SAMPLES = 5
+WINDOW = 50
+
+
+class ExtractTimings:
+    """
+    Rolling window of HTTP-extraction outcomes per master host. A host whose
+    HTTP path succeeds less than HEDGE_SUCCESS_THRESHOLD of the time is
+    "uncertain" and gets the browser started in parallel after its p90.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.hosts = {}   # host -> deque of (seconds, succeeded)
+        self.counters = {"hedged": 0, "http_won": 0, "browser_won": 0, "merged": 0, "skipped_no_capacity": 0}
+
+    def record(self, url: str, seconds: float, succeeded: bool):
+        samples = self.hosts.setdefault(link_host(url), deque(maxlen=self.window))
+        samples.append((seconds, succeeded))
+
+    def success_rate(self, url: str):
+        samples = self.hosts.get(link_host(url))
+        if not samples or len(samples) < MIN_SAMPLES:
+            return None
+        return sum(1 for _, ok in samples if ok) / len(samples)
+
+    def p90(self, url: str):
+        samples = self.hosts.get(link_host(url))
+        if not samples or len(samples) < MIN_SAMPLES:
+            return None
+        durations = sorted(s for s, _ in samples)
+        return durations[min(int(len(durations) * 0.9), len(durations) - 1)]
+
+    def should_hedge(self, url: str) -> bool:
+        if HEDGE_MODE == "always":
+            return True
+        if HEDGE_MODE != "auto":
+            return False
+        rate = self.success_rate(url)
+        # Unknown hosts are uncertain too
+        return rate is None or rate < HEDGE_SUCCESS_THRESHOLD
+
+    def hedge_delay(self, url: str) -> float:
+        """Seconds to give HTTP alone before starting the browser"""
+        p90 = self.p90(url)
+        if p90 is None:
+            return HEDGE_DELAY_SECONDS
+        return min(max(p90, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def count(self, key: str):
+        self.counters[key] += 1
+
+    def snapshot(self) -> dict:
+        hosts = {}
+        for host, samples in self.hosts.items():
+            url = f"http://{host}/"
+            rate = self.success_rate(url)
+            p90 = self.p90(url)
+            hosts[host] = {
+                "samples": len(samples),
+                "success_rate": round(rate, 2) if rate is not None else None,
+                "p90_seconds": round(p90, 2) if p90 is not None else None,
+                "hedged": self.should_hedge(url),
+            }
+        return {"mode": HEDGE_MODE, "counters": dict(self.counters), "hosts": hosts}
+
+
+# Global instance
+extract_timings = ExtractTimings()
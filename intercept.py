@@ -0,0 +1,168 @@
+# intercept.py - Declarative per-host request interception for Playwright scrapes
+import json
+import logging
+import os
+from collections import deque
+from urllib.parse import urlsplit
+
+from links import link_host
+
+logger = logging.getLogger("intercept")
+
+# Optional JSON file: {"default": {...}, "hosts": {"vcloud.lol": {...}}} - keys as in DEFAULT_POLICY
+POLICY_FILE = os.getenv("INTERCEPT_POLICY_FILE")
+RECENT_DECISIONS = 50
+EWMA_ALPHA = 0.3
+
+DEFAULT_POLICY = {
+    # Playwright resource types never needed to find mirror links
+    "block_types": ["image", "stylesheet", "font", "media", "manifest", "texttrack", "eventsource", "websocket"],
+    # Matched against the request host and its parent domains
+    "block_domains": [
+        "googletagmanager.com", "google-analytics.com", "doubleclick.net", "googlesyndication.com",
+        "adservice.google.com", "facebook.net", "hotjar.com", "clarity.ms", "popads.net",
+        "popcash.net", "propellerads.com", "adsterra.com", "onclickads.net",
+    ],
+    "block_paths": ["/ads/", "/analytics/"],
+    # Third-party (not the master host's site) scripts/iframes: "allow" or "block"
+    "third_party_scripts": "allow",
+    "third_party_frames": "block",
+    # Third-party script domains still allowed when third_party_scripts is "block"
+    "allow_script_domains": [],
+}
+
+# Typical transfer sizes, used for "bytes avoided" until real sizes have been seen
+DEFAULT_SIZES = {
+    "image": 40_000, "stylesheet": 30_000, "font": 50_000, "media": 500_000,
+    "script": 60_000, "document": 50_000, "xhr": 5_000, "fetch": 5_000, "other": 10_000,
+}
+
+
+def _site(host: str) -> str:
+    """Registrable-ish domain: last two labels (good enough to tell first from third party)"""
+    return ".".join(host.split(".")[-2:])
+
+
+def _domain_match(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class InterceptPolicy:
+    """
+    Decides allow/block for every request of a scrape (one page.route handler)
+    and keeps per-master-host counters: decisions by resource type/reason, an
+    estimate of bytes avoided, page time and Chromium RSS at the end of the scrape.
+    """
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.default = {**DEFAULT_POLICY, **config.get("default", {})}
+        self.hosts = config.get("hosts", {})
+        self.stats = {}
+        self._sizes = dict(DEFAULT_SIZES)   # EWMA of observed transfer size per resource type
+
+    def policy_for(self, master_url: str) -> dict:
+        return {**self.default, **self.hosts.get(link_host(master_url), {})}
+
+    def decide(self, policy: dict, master_url: str, url: str, resource_type: str, main_frame: bool = False):
+        """-> (allowed, reason)"""
+        parts = urlsplit(url)
+        if parts.scheme in ("data", "blob"):
+            return True, "inline"
+        if main_frame and resource_type == "document":
+            # The page itself, including redirects to a mirror's own domain
+            return True, "navigation"
+        host = (parts.hostname or "").lower()
+        if resource_type in policy["block_types"]:
+            return False, f"type:{resource_type}"
+        if _domain_match(host, policy["block_domains"]):
+            return False, "domain"
+        if any(p in parts.path for p in policy["block_paths"]):
+            return False, "path"
+
+        if _site(host) != _site(link_host(master_url)):
+            if resource_type == "script" and policy["third_party_scripts"] == "block" \
+                    and not _domain_match(host, policy["allow_script_domains"]):
+                return False, "third_party_script"
+            if resource_type == "document" and policy["third_party_frames"] == "block":
+                return False, "third_party_frame"
+        return True, "allowed"
+
+    def _entry(self, master_url: str) -> dict:
+        return self.stats.setdefault(link_host(master_url), {
+            "scrapes": 0, "allowed": {}, "blocked": {}, "bytes_avoided_est": 0,
+            "page_seconds": None, "browser_rss_mb": None, "recent": deque(maxlen=RECENT_DECISIONS),
+        })
+
+    def record(self, master_url: str, url: str, resource_type: str, allowed: bool, reason: str):
+        entry = self._entry(master_url)
+        if allowed:
+            entry["allowed"][resource_type] = entry["allowed"].get(resource_type, 0) + 1
+        else:
+            entry["blocked"][reason] = entry["blocked"].get(reason, 0) + 1
+            entry["bytes_avoided_est"] += int(self._sizes.get(resource_type, DEFAULT_SIZES["other"]))
+        entry["recent"].append({
+            "host": urlsplit(url).hostname, "type": resource_type,
+            "action": "allow" if allowed else "block", "reason": reason,
+        })
+
+    def observe_size(self, resource_type: str, nbytes: int):
+        """Real transfer size of an allowed request, sharpens the bytes-avoided estimate"""
+        old = self._sizes.get(resource_type)
+        self._sizes[resource_type] = nbytes if old is None else EWMA_ALPHA * nbytes + (1 - EWMA_ALPHA) * old
+
+    def record_scrape(self, master_url: str, seconds: float, browser_rss_mb: float):
+        entry = self._entry(master_url)
+        entry["scrapes"] += 1
+        old = entry["page_seconds"]
+        entry["page_seconds"] = round(seconds if old is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * old, 2)
+        entry["browser_rss_mb"] = round(browser_rss_mb, 1)
+
+    async def attach(self, page, master_url: str):
+        """Install the single route handler for this scrape's page"""
+        policy = self.policy_for(master_url)
+
+        async def handle(route):
+            request = route.request
+            try:
+                main_frame = request.frame.parent_frame is None
+            except Exception:
+                main_frame = False  # service-worker requests have no frame
+            allowed, reason = self.decide(policy, master_url, request.url, request.resource_type, main_frame)
+            self.record(master_url, request.url, request.resource_type, allowed, reason)
+            try:
+                if allowed:
+                    await route.continue_()
+                else:
+                    await route.abort("blockedbyclient")
+            except Exception as e:
+                logger.debug(f"Route handling failed for {request.url[:80]}: {e}")
+
+        def on_response(response):
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                self.observe_size(response.request.resource_type, int(length))
+
+        page.on("response", on_response)
+        await page.route("**/*", handle)
+
+    def snapshot(self) -> dict:
+        return {
+            "policy_file": POLICY_FILE,
+            "hosts": {host: {**entry, "recent": list(entry["recent"])} for host, entry in self.stats.items()},
+        }
+
+
+def load_policy(path: str = POLICY_FILE) -> InterceptPolicy:
+    if not path:
+        return InterceptPolicy()
+    try:
+        with open(path) as f:
+            return InterceptPolicy(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load interception policy {path}: {e}; using defaults")
+        return InterceptPolicy()
+
+
+# Global instance
+intercept_policy = load_policy()
@@ -0,0 +1,96 @@
+# leader.py - Mongo lease so background scrapers run in exactly one process/replica
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db import locks_collection
+
+logger = logging.getLogger("leader")
+
+LEADER_ELECTION = os.getenv("LEADER_ELECTION", "1") == "1"
+LEASE_NAME = "scraper-leader"
+LEASE_TTL = int(os.getenv("LEADER_LEASE_SECONDS", 30))
+RENEW_INTERVAL = LEASE_TTL / 3
+
+
+class LeaderLease:
+    """
+    Lease-based leader election: the holder renews `expiresAt` every
+    RENEW_INTERVAL; anyone may take over once it has lapsed. With
+    LEADER_ELECTION=0 this process is always the leader (single-worker setups).
+    """
+
+    def __init__(self, name: str = LEASE_NAME, ttl: int = LEASE_TTL, enabled: bool = LEADER_ELECTION):
+        self.name = name
+        self.ttl = ttl
+        self.enabled = enabled
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = not enabled
+
+    async def try_acquire(self, info: dict = None) -> bool:
+        """Take or renew the lease; info (e.g. queue stats) is published on the lease doc"""
+        if not self.enabled:
+            return True
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await locks_collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.holder}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {
+                    "holder": self.holder,
+                    "expiresAt": now + timedelta(seconds=self.ttl),
+                    "renewedAt": now,
+                    **(info or {})
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return bool(doc and doc.get("holder") == self.holder)
+        except DuplicateKeyError:
+            # Upsert raced with a live lease held by someone else
+            return False
+
+    async def release(self):
+        if self.enabled and self.is_leader:
+            await locks_collection.update_one(
+                {"_id": self.name, "holder": self.holder},
+                {"$set": {"expiresAt": datetime.now(timezone.utc)}}
+            )
+        self.is_leader = not self.enabled
+
+    async def current(self):
+        """The lease doc (holder + whatever the leader published), or None"""
+        return await locks_collection.find_one({"_id": self.name})
+
+    async def run(self, on_elected, on_demoted, info=None):
+        """Keep renewing; awaits on_elected()/on_demoted() whenever leadership changes"""
+        if not self.enabled:
+            await on_elected()
+            return
+
+        while True:
+            try:
+                acquired = await self.try_acquire(info() if info else None)
+            except Exception as e:
+                logger.warning(f"Lease renewal failed: {e}")
+                acquired = False  # can't prove we still hold it - step down
+
+            if acquired and not self.is_leader:
+                self.is_leader = True
+                logger.info(f"👑 {self.holder} is now the scraper leader")
+                await on_elected()
+            elif not acquired and self.is_leader:
+                self.is_leader = False
+                logger.warning(f"{self.holder} lost the scraper lease")
+                await on_demoted()
+
+            await asyncio.sleep(RENEW_INTERVAL)
+
+
+# Global instance
+leader_lease = LeaderLease()
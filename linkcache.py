@@ -0,0 +1,136 @@
+# linkcache.py - Scrape results cached by normalized master URL (shared across episodes/qualities)
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+import cache
+from db import linkcache_collection
+from links import canonical_url, link_host
+from scraper import scrape_vcloud
+
+logger = logging.getLogger("linkcache")
+
+SOURCE = "vcloud"
+DEFAULT_LINK_TTL = int(os.getenv("LINKCACHE_DEFAULT_TTL", 3600))
+MIN_LINK_TTL = 600
+MAX_LINK_TTL = int(os.getenv("LINKCACHE_MAX_TTL", 6 * 3600))
+LIFETIME_SAFETY = 0.8     # expire a bit before links are observed to die
+L1_TTL = 300              # in-process copy (cache.py) in front of Mongo
+EWMA_ALPHA = 0.3
+
+# Observed lifetime of scraped links, per master host (seconds)
+_lifetimes = {}
+stats = {"hits": 0, "misses": 0, "scrapes": 0}
+
+
+def cache_key(url: str) -> str:
+    return f"linkcache:{SOURCE}:{canonical_url(url)}"
+
+
+def link_ttl(url: str) -> int:
+    """TTL for a fresh scrape of url, derived from how long its links have lived so far"""
+    observed = _lifetimes.get(link_host(url))
+    if observed is None:
+        return DEFAULT_LINK_TTL
+    return int(min(max(observed * LIFETIME_SAFETY, MIN_LINK_TTL), MAX_LINK_TTL))
+
+
+def _observe_lifetime(url: str, seconds: float):
+    host = link_host(url)
+    old = _lifetimes.get(host)
+    _lifetimes[host] = seconds if old is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * old
+
+
+async def lookup(url: str):
+    """Fresh cached scrape result for url as (servers, expireAt), or None"""
+    key = cache_key(url)
+    entry = await cache.get_cached(key)
+    if entry is not None:
+        stats["hits"] += 1
+        return entry
+
+    doc = await linkcache_collection.find_one({"_id": key})
+    if doc and doc.get("expireAt") and doc["expireAt"] > datetime.now(timezone.utc):
+        entry = (doc.get("servers", {}), doc["expireAt"])
+        remaining = (doc["expireAt"] - datetime.now(timezone.utc)).total_seconds()
+        await cache.set_cached(key, entry, ttl=min(L1_TTL, remaining))
+        stats["hits"] += 1
+        return entry
+
+    stats["misses"] += 1
+    return None
+
+
+async def store(url: str, servers: dict):
+    key = cache_key(url)
+    ttl = link_ttl(url)
+    now = datetime.now(timezone.utc)
+    expire_at = now + timedelta(seconds=ttl)
+    await linkcache_collection.update_one(
+        {"_id": key},
+        {"$set": {
+            "url": url,
+            "servers": servers,
+            "scrapedAt": now,
+            "expireAt": expire_at
+        }},
+        upsert=True
+    )
+    await cache.set_cached(key, (servers, expire_at), ttl=min(L1_TTL, ttl))
+
+
+def remaining_ttl(expire_at, ttl: int) -> int:
+    """ttl capped so a reused result is not cached past its own expireAt (None = no cap)"""
+    if expire_at is None:
+        return ttl
+    return max(min(ttl, int((expire_at - datetime.now(timezone.utc)).total_seconds())), 0)
+
+
+async def cached_scrape(url: str, force: bool = False):
+    """
+    scrape_vcloud(url) through the URL-keyed cache; force skips the lookup and overwrites.
+    Returns (servers, expireAt of the reused entry or None for a new scrape).
+    """
+    if not force:
+        entry = await lookup(url)
+        if entry is not None:
+            servers, expire_at = entry
+            logger.info(f"Link cache hit for {url} ({len(servers)} servers)")
+            return dict(servers), expire_at
+
+    servers = await scrape_vcloud(url) or {}
+    stats["scrapes"] += 1
+    if servers:
+        await store(url, servers)
+    return servers, None
+
+
+async def observe_revalidation(url: str, dead: int, alive: int):
+    """
+    Feed revalidation results of links scraped from url into the lifetime estimate.
+    Dead links bound the lifetime from above, survivors older than the estimate raise it.
+    """
+    doc = await linkcache_collection.find_one({"_id": cache_key(url)}, {"scrapedAt": 1})
+    if not doc or not doc.get("scrapedAt"):
+        return
+    age = (datetime.now(timezone.utc) - doc["scrapedAt"]).total_seconds()
+    observed = _lifetimes.get(link_host(url))
+    if dead:
+        _observe_lifetime(url, age)
+        # The cached result still lists the dead links - never hand it out again
+        await invalidate(url)
+    elif alive and (observed is None or age > observed):
+        _observe_lifetime(url, age)
+
+
+async def invalidate(url: str):
+    key = cache_key(url)
+    await cache.delete_cached(key)
+    await linkcache_collection.delete_one({"_id": key})
+
+
+def snapshot() -> dict:
+    return {
+        **stats,
+        "lifetimes": {host: round(seconds) for host, seconds in _lifetimes.items()},
+    }
@@ -0,0 +1,131 @@
+# links.py - Helpers for scraped server links (canonical URLs, dedup, server records)
+from typing import Dict, List
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+TRACKING_PARAMS = {"fbclid", "gclid"}  # plus any utm_* param
+MIN_SERVERS_REQUIRED = 9   # fewer cached servers than this -> episode needs a force scrape
+
+
+def _is_tracking_param(name: str) -> bool:
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so two spellings of the same link compare equal.
+    Only changes things servers ignore (case of scheme/host, default port,
+    fragment, tracking params) so the result is still a working link.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    # Rebuilt from the raw netloc: credentials and IPv6 brackets are kept as they are
+    userinfo, at, hostport = parts.netloc.rpartition("@")
+    if hostport.startswith("["):
+        host, _, port = hostport.partition("]")
+        host, port = host + "]", port[1:]
+    else:
+        host, _, port = hostport.partition(":")
+    netloc = f"{userinfo}{at}{host.lower()}"
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+
+    # Filter the raw query string so signed-URL encoding is left untouched
+    query = "&".join(
+        p for p in parts.query.split("&")
+        if p and not _is_tracking_param(p.split("=", 1)[0].lower())
+    )
+
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def link_host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def dedupe_servers(servers: Dict[str, str]) -> Dict[str, str]:
+    """Drop servers whose URL is the same link as an earlier one (first name wins)"""
+    seen = set()
+    unique = {}
+    for name, url in servers.items():
+        if not url:
+            continue
+        key = canonical_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique[name] = url
+    return unique
+
+
+def server_record(quality: str, url: str, discovered_at, score=None) -> dict:
+    """
+    Stored form of one cached server (cache doc `servers` list). Scraped names
+    (anchor text, truncated hrefs) are not kept - the host is the label.
+    """
+    url = canonical_url(url)
+    return {
+        "quality": str(quality),
+        "host": link_host(url),
+        "url": url,
+        "discoveredAt": discovered_at,
+        "score": round(score, 2) if score is not None else None,
+    }
+
+
+def merge_records(*record_lists) -> List[dict]:
+    """
+    One record per (quality, canonical url), in first-seen order. A URL seen
+    again keeps its original discoveredAt and takes the newest known score
+    and redirect resolution.
+    """
+    merged = {}
+    for records in record_lists:
+        for rec in records:
+            key = (rec["quality"], canonical_url(rec["url"]))
+            old = merged.get(key)
+            if old is None:
+                merged[key] = dict(rec, url=key[1])
+            else:
+                if rec.get("score") is not None:
+                    old["score"] = rec["score"]
+                if rec.get("resolvedUrl"):
+                    old["resolvedUrl"], old["resolvedExpireAt"] = rec["resolvedUrl"], rec["resolvedExpireAt"]
+    return list(merged.values())
+
+
+def legacy_records(links: dict, discovered_at=None) -> List[dict]:
+    """Records from the old {quality: {name: url}} cache shape"""
+    return merge_records([
+        server_record(quality, url, discovered_at)
+        for quality, servers in (links or {}).items() if isinstance(servers, dict)
+        for url in servers.values() if url
+    ])
+
+
+def cache_records(cache_doc) -> List[dict]:
+    """Server records of a cache doc (pre-migration docs are converted on the fly)"""
+    if not cache_doc:
+        return []
+    if "servers" in cache_doc:
+        return cache_doc["servers"] or []
+    return legacy_records(cache_doc.get("links"), cache_doc.get("updatedAt"))
+
+
+def servers_by_quality(records: List[dict]) -> Dict[str, Dict[str, str]]:
+    """{quality: {label: url}} view for code that works on name -> url dicts (labels are hosts)"""
+    grouped = {}
+    for rec in records:
+        servers = grouped.setdefault(rec["quality"], {})
+        label, n = rec["host"], 1
+        while label in servers:
+            n += 1
+            label = f"{rec['host']} #{n}"
+        servers[label] = rec["url"]
+    return grouped
+
+
+def count_servers(records: List[dict]) -> int:
+    """Count cached servers (see cache_records)"""
+    return len(records or ())
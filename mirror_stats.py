@@ -0,0 +1,113 @@
+# mirror_stats.py - Rolling per-host playback speed scores (TTFB + ranged-read throughput)
+import math
+import os
+import time
+
+from links import link_host
+from redirects import serve_url
+
+EWMA_ALPHA = 0.3
+SCORE_STEP = math.log(1.25)   # ranking signatures change only when a host's score moves ~25%
+STARTUP_BYTES = int(os.getenv("MIRROR_STARTUP_BYTES", 2 * 1024 * 1024))  # bytes a player buffers before starting
+
+
+class MirrorStats:
+    """
+    Keeps an EWMA of time-to-first-byte, throughput and failure rate per host.
+    score = expected seconds until STARTUP_BYTES are buffered (lower is faster),
+    inflated by the host's recent failure rate.
+    """
+
+    def __init__(self):
+        self._hosts = {}  # host -> {"ttfb", "bps", "fail_rate", "samples", "updated"}
+
+    def _entry(self, host: str) -> dict:
+        return self._hosts.setdefault(host, {
+            "ttfb": None, "bps": None, "fail_rate": 0.0, "samples": 0, "updated": None
+        })
+
+    @staticmethod
+    def _ewma(old, new):
+        return new if old is None else EWMA_ALPHA * new + (1 - EWMA_ALPHA) * old
+
+    def record(self, url: str, ttfb: float, nbytes: int, seconds: float):
+        """Record a successful ranged read: ttfb and body transfer time in seconds"""
+        entry = self._entry(link_host(url))
+        entry["ttfb"] = self._ewma(entry["ttfb"], ttfb)
+        if nbytes > 0 and seconds > 0:
+            entry["bps"] = self._ewma(entry["bps"], nbytes / seconds)
+        entry["fail_rate"] = self._ewma(entry["fail_rate"], 0.0)
+        entry["samples"] += 1
+        entry["updated"] = time.time()
+
+    def record_failure(self, url: str):
+        entry = self._entry(link_host(url))
+        entry["fail_rate"] = self._ewma(entry["fail_rate"], 1.0)
+        entry["updated"] = time.time()
+
+    def score(self, url: str):
+        entry = self._hosts.get(link_host(url))
+        if not entry or entry["ttfb"] is None:
+            return None
+        transfer = STARTUP_BYTES / entry["bps"] if entry["bps"] else 0.0
+        reliability = max(1.0 - entry["fail_rate"], 0.1)
+        return (entry["ttfb"] + transfer) / reliability
+
+    def describe(self, url: str):
+        """Score plus the raw measurements, for API responses"""
+        entry = self._hosts.get(link_host(url))
+        score = self.score(url)
+        if score is None:
+            return None
+        return {
+            "score": round(score, 2),
+            "ttfb_ms": round(entry["ttfb"] * 1000),
+            "kbps": round(entry["bps"] * 8 / 1000) if entry["bps"] else None,
+            "fail_rate": round(entry["fail_rate"], 2),
+        }
+
+    def rank_records(self, records: list) -> list:
+        """
+        Cached server records (links.server_record) for API responses: grouped by
+        quality, fastest first. Live measurements win over the score stored at
+        discovery; servers with neither keep their order at the end.
+        `url` is the pre-resolved redirect target while it is fresh, with the
+        stored link as `fallback`.
+        """
+        def key(item):
+            i, rec = item
+            score = self.score(rec["url"])
+            if score is None:
+                score = rec.get("score")
+            return (rec["quality"], score is None, score if score is not None else 0.0, i)
+
+        ranked = []
+        for _, rec in sorted(enumerate(records), key=key):
+            url, fallback = serve_url(rec)
+            out = {"quality": rec["quality"], "host": rec["host"], "url": url, "score": rec.get("score")}
+            if fallback:
+                out["fallback"] = fallback
+            desc = self.describe(rec["url"])
+            if desc:
+                out.update(desc)
+            ranked.append(out)
+        return ranked
+
+    def ranking_signature(self, records: list) -> tuple:
+        """
+        How these records' hosts currently score, quantized to SCORE_STEP: equal
+        signatures rank the same, so a cached ranking of them is still good.
+        """
+        signature = set()
+        for rec in records:
+            score = self.score(rec["url"])
+            bucket = round(math.log(score) / SCORE_STEP) if score and score > 0 else None
+            signature.add((rec["host"], bucket))
+        return tuple(sorted(signature, key=lambda item: (item[0], item[1] is None, item[1] or 0)))
+
+    def snapshot(self) -> dict:
+        return {host: dict(entry) for host, entry in self._hosts.items()}
+
+
+# Global instance
+mirror_stats = MirrorStats()
@@ -0,0 +1,97 @@
+# page_scanner.py - Incremental mirror-link scanner for streamed vcloud pages (no full-page buffering)
+import codecs
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from links import link_host
+
+URL_PATTERN = re.compile(r"(https?://[^\s'\"<>]+(?:pixeldrain|fsl|10gbps|pixelserver|vcloud)[^\s'\"<>]*)", re.IGNORECASE)
+REGEX_OVERLAP = 2048   # tail kept between chunks so URLs split across chunks still match
+
+# Per master host: bytes actually read vs. skipped by stopping early (when Content-Length was known)
+fetch_stats = {}
+
+
+class LinkScanner(HTMLParser):
+    """
+    Feed decoded HTML chunk by chunk. Collects <a href> candidates whose text
+    or href mention one of `keywords` (same rule the old BeautifulSoup pass
+    used) plus raw mirror URLs for the regex fallback.
+    """
+
+    def __init__(self, base_url: str, keywords):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.keywords = [k.lower() for k in keywords]
+        self.links = {}          # anchor text (or href) -> absolute url
+        self.raw_urls = []       # regex fallback matches, in page order
+        self._seen_raw = set()
+        self._href = None
+        self._text = []
+        self._tail = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._finish_anchor()
+            self._href = dict(attrs).get("href")
+            self._text = []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._finish_anchor()
+
+    def _finish_anchor(self):
+        href, self._href = self._href, None
+        if not href:
+            return
+        text = "".join(self._text).strip().lower()
+        if any(k in text or k in href.lower() for k in self.keywords):
+            self.links[text or href] = urljoin(self.base_url, href)
+
+    def scan(self, chunk: str):
+        self.feed(chunk)
+        window = self._tail + chunk
+        for match in URL_PATTERN.finditer(window):
+            # A match touching the end of the window may continue in the next chunk
+            if match.end() < len(window):
+                self._add_raw(match.group(1))
+        self._tail = window[-REGEX_OVERLAP:]
+
+    def _add_raw(self, url: str):
+        if url not in self._seen_raw:
+            self._seen_raw.add(url)
+            self.raw_urls.append(url)
+
+    def finish(self):
+        self.close()
+        self._finish_anchor()
+        for match in URL_PATTERN.finditer(self._tail):
+            self._add_raw(match.group(1))
+
+    @property
+    def candidates(self) -> int:
+        return len(self.links)
+
+
+def decoder_for(charset):
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def record_fetch(url: str, read: int, content_length, stopped_early: bool, capped: bool):
+    entry = fetch_stats.setdefault(link_host(url), {
+        "fetches": 0, "bytes_read": 0, "bytes_saved": 0, "early_stops": 0, "capped": 0
+    })
+    entry["fetches"] += 1
+    entry["bytes_read"] += read
+    if content_length and content_length > read:
+        entry["bytes_saved"] += content_length - read
+    entry["early_stops"] += int(stopped_early)
+    entry["capped"] += int(capped)
@@ -0,0 +1,102 @@
+# payloads.py - Pre-serialized, pre-compressed responses keyed by content version
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+PAYLOAD_CACHE_ENTRIES = int(os.getenv("PAYLOAD_CACHE_ENTRIES", 500))
+MIN_COMPRESS_BYTES = 512
+
+
+def parse_accept_encoding(header: str) -> list:
+    """'br;q=0, gzip' -> [("br", 0.0), ("gzip", 1.0)] (a malformed q counts as 0)"""
+    codings = []
+    for part in (header or "").lower().split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings.append((coding, q))
+    return codings
+
+
+class Payload:
+    """One response body plus its compressed variants and ETags"""
+
+    def __init__(self, body: bytes, best: bool = False):
+        # best=True spends more CPU once for bodies that are built at startup (static assets)
+        self.body = body
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+        self.variants = {"identity": self.body}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(self.body, compresslevel=9 if best else 6)
+            if brotli:
+                self.variants["br"] = brotli.compress(self.body, quality=11 if best else 5)
+
+    @classmethod
+    def from_data(cls, data: dict) -> "Payload":
+        return cls(json.dumps(data, separators=(",", ":"), default=str).encode())
+
+    def negotiate(self, accept_encoding: str):
+        """Pick the smallest variant the client accepts -> (bytes, encoding, strong etag)"""
+        accepted = {coding for coding, q in parse_accept_encoding(accept_encoding) if q > 0}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                # Each content-coding gets its own strong validator
+                return self.variants[encoding], encoding, f'"{self.etag}-{encoding}"'
+        return self.body, None, f'"{self.etag}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if any ETag in If-None-Match is one of this payload's variants"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/").strip('"')
+            if tag.split("-")[0] == self.etag:
+                return True
+        return False
+
+
+class PayloadCache:
+    """LRU of the latest Payload per key; a new version replaces the old one"""
+
+    def __init__(self, max_entries: int = PAYLOAD_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, Payload)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, version, data: dict) -> Payload:
+        payload = Payload.from_data(data)
+        self._entries[key] = (version, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return payload
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "brotli": bool(brotli)}
@@ -0,0 +1,107 @@
+# redirects.py - Final (post-redirect) media URLs seen while validating links, with expiry hints
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlsplit
+
+from links import canonical_url
+
+REDIRECT_DEFAULT_TTL = int(os.getenv("REDIRECT_DEFAULT_TTL", 600))  # when the target gives no hint
+REDIRECT_MAX_TTL = int(os.getenv("REDIRECT_MAX_TTL", 6 * 3600))
+EXPIRY_MARGIN = 60           # stop serving a resolved URL this long before it is expected to die
+MAX_ENTRIES = 20000
+
+EPOCH_PARAMS = ("expires", "expire", "expiry", "exp", "e", "validto", "valid_until", "deadline")
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def expiry_hint(url: str, headers=None, now: datetime = None) -> datetime:
+    """
+    When a resolved URL should stop being served: signed-URL params
+    (expires=<epoch>, X-Amz-Date + X-Amz-Expires), else Cache-Control max-age /
+    Expires of the final response, else REDIRECT_DEFAULT_TTL. Capped at REDIRECT_MAX_TTL.
+    """
+    now = now or datetime.now(timezone.utc)
+    hint = None
+    params = {k.lower(): v for k, v in parse_qsl(urlsplit(url).query)}
+
+    for name in EPOCH_PARAMS:
+        value = params.get(name, "")
+        if value.isdigit() and len(value) in (10, 13):
+            seconds = int(value) / (1000 if len(value) == 13 else 1)
+            hint = datetime.fromtimestamp(seconds, timezone.utc)
+            break
+
+    if hint is None and "x-amz-date" in params and params.get("x-amz-expires", "").isdigit():
+        try:
+            signed = datetime.strptime(params["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            hint = signed + timedelta(seconds=int(params["x-amz-expires"]))
+        except ValueError:
+            pass
+
+    if hint is None and headers:
+        match = MAX_AGE.search(headers.get("Cache-Control", ""))
+        if match:
+            hint = now + timedelta(seconds=int(match.group(1)))
+        elif headers.get("Expires"):
+            try:
+                hint = parsedate_to_datetime(headers["Expires"])
+                if hint.tzinfo is None:
+                    hint = hint.replace(tzinfo=timezone.utc)   # "-0000" zone parses as naive
+            except (TypeError, ValueError):
+                pass
+
+    if hint is None:
+        hint = now + timedelta(seconds=REDIRECT_DEFAULT_TTL)
+    return min(hint, now + timedelta(seconds=REDIRECT_MAX_TTL)) - timedelta(seconds=EXPIRY_MARGIN)
+
+
+class RedirectCache:
+    """
+    canonical original link -> (final url, expireAt). Filled by scraper
+    validation (which already follows redirects) and attached to server
+    records when they are cached, so /get_link can skip the redirect chain.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self.stats = {"resolved": 0, "direct": 0}
+
+    def record(self, original: str, final: str, headers=None):
+        key = canonical_url(original)
+        if canonical_url(final) == key:
+            self.stats["direct"] += 1
+            self._entries.pop(key, None)
+            return
+        expire_at = expiry_hint(final, headers)
+        if expire_at <= datetime.now(timezone.utc):
+            return
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (final, expire_at)
+        self.stats["resolved"] += 1
+
+    def lookup(self, original: str):
+        """(final url, expireAt) if a fresh resolution is known, else None"""
+        entry = self._entries.get(canonical_url(original))
+        if entry and entry[1] > datetime.now(timezone.utc):
+            return entry
+        return None
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+def serve_url(record: dict, now: datetime = None):
+    """(url to hand to players, fallback or None) for a cached server record"""
+    now = now or datetime.now(timezone.utc)
+    resolved, expire_at = record.get("resolvedUrl"), record.get("resolvedExpireAt")
+    if resolved and expire_at and expire_at > now:
+        return resolved, record["url"]
+    return record["url"], None
+
+
+# Global instance
+redirect_cache = RedirectCache()
@@ -0,0 +1,90 @@
+# refresh.py - Incremental episode refresh: revalidate cached servers, scrape only what is missing
+import asyncio
+import logging
+import math
+import os
+
+from db import get_episode, get_cached, set_cached_quality
+from links import dedupe_servers, MIN_SERVERS_REQUIRED
+from linkcache import cached_scrape, observe_revalidation, remaining_ttl
+from scraper import revalidate_links
+
+logger = logging.getLogger("refresh")
+
+# Floor per quality: 9 servers across 480/720/1080 -> 3 each keeps MIN_SERVERS_REQUIRED satisfied
+MIN_SERVERS_PER_QUALITY = int(os.getenv("MIN_SERVERS_PER_QUALITY", 3))
+
+REFRESH_MODES = ("incremental", "full")
+
+
+async def refresh_episode(ep_id: str, mode: str = "incremental", ttl: int = 3600,
+                          qualities=None, on_quality=None):
+    """
+    Refresh one episode's cached links.
+
+    - incremental: revalidate cached servers, drop dead ones, and only scrape
+      qualities that fall below their share of MIN_SERVERS_REQUIRED (at least
+      MIN_SERVERS_PER_QUALITY)
+    - full: revalidate AND scrape every quality, keeping the union
+
+    Each quality is written (replacing its old servers) as soon as it is done.
+    `qualities` limits the refresh to a subset; `on_quality(quality, servers, scraped)`
+    is awaited after each quality is cached.
+
+    Returns {quality: servers} or None if the episode does not exist.
+    """
+    if mode not in REFRESH_MODES:
+        raise ValueError(f"Unknown refresh mode: {mode}")
+
+    episode_doc = await get_episode(ep_id)
+    if not episode_doc:
+        return None
+
+    master = episode_doc.get("master", {})
+    # Episodes with fewer qualities need more servers each to reach MIN_SERVERS_REQUIRED
+    # (what the player's Force Scrape warning checks)
+    per_quality = max(MIN_SERVERS_PER_QUALITY, math.ceil(MIN_SERVERS_REQUIRED / max(len(master), 1)))
+    if qualities:
+        master = {q: url for q, url in master.items() if q in qualities}
+    # A targeted refresh must not renew the lease of qualities it did not revalidate
+    extend = len(master) == len(episode_doc.get("master", {}))
+
+    cached = await get_cached(ep_id) or {}
+
+    # Revalidate every quality's cached servers concurrently
+    targets = [q for q in master if cached.get(q)]
+    checked = await asyncio.gather(*(revalidate_links(cached[q]) for q in targets))
+    alive = dict(zip(targets, checked))
+
+    results = {}
+    for quality, vcloud_url in master.items():
+        had = len(cached.get(quality) or {})
+        servers = dedupe_servers(alive.get(quality, {}))
+        dropped = had - len(servers)
+        if had:
+            await observe_revalidation(vcloud_url, dead=had - len(alive.get(quality, {})), alive=len(servers))
+
+        scraped = mode == "full" or len(servers) < per_quality
+        if scraped:
+            try:
+                # A quality with nothing cached can reuse another episode's scrape of the same URL;
+                # one that already had servers needs a genuinely new scrape
+                fresh, reused_until = await cached_scrape(vcloud_url, force=mode == "full" or bool(had))
+                servers = dedupe_servers({**servers, **fresh})
+                # Never keep a reused result past its link cache expiry; the running minimum
+                # also covers qualities written after this one (each write sets expireAt)
+                ttl = remaining_ttl(reused_until, ttl)
+            except Exception as e:
+                logger.error(f"Failed to scrape {ep_id} {quality}p: {e}")
+
+        logger.info(
+            f"{ep_id} {quality}p: {len(servers)} servers "
+            f"({dropped} dropped, {'scraped' if scraped else 'revalidated only'})"
+        )
+        await set_cached_quality(ep_id, quality, servers, ttl=ttl, extend=extend)
+        results[quality] = servers
+
+        if on_quality:
+            await on_quality(quality, servers, scraped)
+
+    return results
@@ -0,0 +1,228 @@
+# relay.py - Optional Range relay: first N MB of hot episodes served from an mmap'd on-disk LRU cache
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+from links import canonical_url
+
+logger = logging.getLogger("relay")
+
+RELAY_ENABLED = os.getenv("RELAY_ENABLED", "0") == "1"
+RELAY_PREFIX_BYTES = int(os.getenv("RELAY_PREFIX_MB", 8)) * 1024 * 1024
+RELAY_CACHE_BYTES = int(os.getenv("RELAY_CACHE_MB", 512)) * 1024 * 1024
+RELAY_CACHE_DIR = Path(os.getenv("RELAY_CACHE_DIR", "/tmp/relay-cache"))
+RELAY_HOT_SCORE = float(os.getenv("RELAY_HOT_SCORE", 5))   # decayed hits (db.record_view) to count as hot
+RELAY_CHUNK = 64 * 1024
+FILL_TIMEOUT = 60
+PASSTHROUGH_HEADERS = ("Content-Type", "Content-Length", "Content-Range", "Accept-Ranges", "Last-Modified", "ETag")
+
+RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+_session = None
+
+
+async def get_session():
+    """Pooled client shared by every relayed stream (keep-alive to the mirrors)"""
+    global _session
+    if _session is None or _session.closed:
+        import aiohttp
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=8, ssl=False),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def parse_range(header, total=None):
+    """'bytes=a-b' -> (start, end inclusive or None); None for absent/multi/unsupported ranges"""
+    if not header:
+        return None
+    match = RANGE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    start, end = match.group(1), match.group(2)
+    if not start:
+        # Suffix range: last N bytes (needs the total length)
+        if total is None:
+            return None
+        return max(total - int(end), 0), total - 1
+    return int(start), int(end) if end else None
+
+
+class PrefixCache:
+    """
+    First RELAY_PREFIX_BYTES of direct links, one file per canonical URL (plus a
+    small .json with the upstream total length / content type). Reads are
+    served through mmap; total size is bounded with LRU eviction.
+    """
+
+    def __init__(self, directory: Path = RELAY_CACHE_DIR, max_bytes: int = RELAY_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()   # key -> {"size", "total", "type"}, least recently used first
+        self._filling = {}            # key -> asyncio.Task
+        self.stats = {"hits": 0, "misses": 0, "fills": 0, "evictions": 0, "bytes_served": 0}
+
+    def load(self):
+        """Rebuild the index from disk (oldest first) so the cache survives restarts"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        metas = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for meta_path in metas:
+            data_path = meta_path.with_suffix(".bin")
+            try:
+                meta = json.loads(meta_path.read_text())
+                meta["size"] = data_path.stat().st_size
+            except (OSError, ValueError):
+                meta_path.unlink(missing_ok=True)
+                data_path.unlink(missing_ok=True)
+                continue
+            self._index[meta_path.stem] = meta
+        self._evict()
+        return self
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(canonical_url(url).encode()).hexdigest()
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.bin", self.directory / f"{key}.json"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(meta["size"] for meta in self._index.values())
+
+    def get(self, url: str):
+        """Cached prefix meta for url (marks it recently used), or None"""
+        key = self.key(url)
+        meta = self._index.get(key)
+        if meta is None:
+            self.stats["misses"] += 1
+            return None
+        self._index.move_to_end(key)
+        self.stats["hits"] += 1
+        return meta
+
+    def open(self, url: str):
+        """Read-only mmap of the cached prefix (caller closes it), or None if it was evicted"""
+        data_path, _ = self._paths(self.key(url))
+        try:
+            with open(data_path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._index.pop(self.key(url), None)
+            return None
+
+    def schedule_fill(self, url: str, fetch_url: str = None):
+        """Cache url's prefix in the background (fetched from fetch_url, e.g. its resolved redirect)"""
+        key = self.key(url)
+        if key in self._index or key in self._filling:
+            return
+        task = asyncio.create_task(self._fill(key, fetch_url or url))
+        self._filling[key] = task
+        task.add_done_callback(lambda _: self._filling.pop(key, None))
+
+    async def _fill(self, key: str, url: str):
+        data_path, meta_path = self._paths(key)
+        tmp_path = data_path.with_suffix(".part")
+        session = await get_session()
+
+        async def download():
+            async with session.get(url, headers={"Range": f"bytes=0-{RELAY_PREFIX_BYTES - 1}"}) as resp:
+                if resp.status not in (200, 206):
+                    return None
+                size = 0
+                with open(tmp_path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(RELAY_CHUNK):
+                        chunk = chunk[:RELAY_PREFIX_BYTES - size]
+                        f.write(chunk)
+                        size += len(chunk)
+                        if size >= RELAY_PREFIX_BYTES:
+                            break
+                return {"size": size, "total": _total_length(resp), "type": resp.headers.get("Content-Type", "video/mp4")}
+
+        try:
+            meta = await asyncio.wait_for(download(), FILL_TIMEOUT)
+            if not meta or not meta["size"] or meta["total"] is None:
+                tmp_path.unlink(missing_ok=True)
+                return
+            os.replace(tmp_path, data_path)
+            size = meta["size"]
+            meta_path.write_text(json.dumps(meta))
+            self._index[key] = meta
+            self.stats["fills"] += 1
+            self._evict()
+            logger.info(f"Cached first {size // 1024} KB of {url[:80]}")
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"Relay prefix fill failed for {url[:80]}: {e}")
+
+    def _evict(self):
+        while self._index and self.total_bytes > self.max_bytes:
+            key, _ = self._index.popitem(last=False)
+            for path in self._paths(key):
+                # Open mmaps keep working on Linux after unlink
+                path.unlink(missing_ok=True)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._index),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "filling": len(self._filling),
+        }
+
+
+def _total_length(resp):
+    """Full resource length from Content-Range (206) or Content-Length (200)"""
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    if resp.status == 200 and resp.content_length is not None:
+        return resp.content_length
+    return None
+
+
+async def stream_prefixed(url: str, fetch_url: str, start: int, end: int):
+    """Bytes start..end: the cached prefix of url (mmap'd here, closed when done), the remainder from fetch_url"""
+    mm = prefix_cache.open(url)   # None if evicted since the lookup: everything comes from the mirror
+    if mm is not None:
+        try:
+            cached_end = min(end, len(mm) - 1)
+            for offset in range(start, cached_end + 1, RELAY_CHUNK):
+                chunk = mm[offset:min(offset + RELAY_CHUNK, cached_end + 1)]
+                prefix_cache.stats["bytes_served"] += len(chunk)
+                yield chunk
+            start = max(start, cached_end + 1)
+        finally:
+            mm.close()
+    if start > end:
+        return
+
+    session = await get_session()
+    async with session.get(fetch_url, headers={"Range": f"bytes={start}-{end}"}) as resp:
+        if resp.status != 206:
+            # Mirror ignored the range; the bytes already sent would be repeated
+            logger.warning(f"Mirror answered {resp.status} to a continuation range for {fetch_url[:80]}")
+            return
+        async for chunk in resp.content.iter_chunked(RELAY_CHUNK):
+            yield chunk
+
+
+# Global instance (index loaded at startup when the relay is enabled)
+prefix_cache = PrefixCache()
@@ -0,0 +1,159 @@
+# scrape_queue.py - Bounded scrape queue with throughput-based admission
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+
+SCRAPE_QUEUE_MAX = int(os.getenv("SCRAPE_QUEUE_MAX", 20))
+MAX_QUEUE_WAIT = int(os.getenv("MAX_QUEUE_WAIT_SECONDS", 600))  # users give up after ~10 min
+DEFAULT_SCRAPE_SECONDS = float(os.getenv("DEFAULT_SCRAPE_SECONDS", 60))  # until we have measurements
+SCRAPE_COOLDOWN_SECONDS = int(os.getenv("SCRAPE_COOLDOWN_SECONDS", 600))
+COOLDOWN_MAX_ENTRIES = int(os.getenv("COOLDOWN_MAX_ENTRIES", 5000))
+
+EWMA_ALPHA = 0.3
+
+
+def remote_retry_after(stats: dict, pending: int, maxsize: int = SCRAPE_QUEUE_MAX,
+                       max_wait: float = MAX_QUEUE_WAIT) -> int:
+    """
+    Admission check for a worker that forwards scrapes to the leader's queue.
+    stats = the leader's published ScrapeQueue.stats(); pending = forwarded but
+    not yet claimed. Returns 0 to admit, otherwise seconds for Retry-After.
+    """
+    avg = stats.get("avg_scrape_seconds") or DEFAULT_SCRAPE_SECONDS
+    waiting = stats.get("queued", 0) + pending
+    wait = (waiting + 1 + (1 if stats.get("processing") else 0)) * avg
+    if waiting < maxsize and wait <= max_wait:
+        return 0
+    return max(int(math.ceil(max(avg if waiting >= maxsize else 0, wait - max_wait))), 1)
+
+
+class ExpiringDict:
+    """Size-bounded map whose entries expire a fixed TTL after they were set"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (value, expiry), oldest first
+
+    def _purge(self, now: float):
+        # Fixed TTL means insertion order == expiry order
+        while self._data:
+            key, (_, expiry) = next(iter(self._data.items()))
+            if expiry > now:
+                break
+            self._data.popitem(last=False)
+
+    def set(self, key, value):
+        now = time.monotonic()
+        self._purge(now)
+        self._data.pop(key, None)
+        self._data[key] = (value, now + self.ttl)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        self._purge(time.monotonic())
+        entry = self._data.get(key)
+        return entry[0] if entry else default
+
+    def remaining(self, key) -> float:
+        """Seconds until key expires (0 if missing)"""
+        now = time.monotonic()
+        self._purge(now)
+        entry = self._data.get(key)
+        return max(entry[1] - now, 0.0) if entry else 0.0
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else default
+
+    def __contains__(self, key):
+        return self.remaining(key) > 0
+
+    def __len__(self):
+        self._purge(time.monotonic())
+        return len(self._data)
+
+
+class ScrapeQueue:
+    """
+    asyncio.Queue wrapper that sheds load instead of growing without bound.
+    Admission is based on measured per-episode scrape time: a request is
+    rejected when the queue is full OR when it would not finish within
+    MAX_QUEUE_WAIT seconds at the current throughput.
+    """
+
+    def __init__(self, maxsize: int = SCRAPE_QUEUE_MAX, max_wait: float = MAX_QUEUE_WAIT):
+        self._queue = asyncio.Queue(maxsize)
+        self.maxsize = maxsize
+        self.max_wait = max_wait
+        self.queued = set()           # episode ids waiting in the queue
+        self.avg_seconds = None       # EWMA of per-episode scrape duration
+        self.completed = 0
+        self._started = None          # monotonic start of the job being processed
+
+    @property
+    def scrape_seconds(self) -> float:
+        return self.avg_seconds if self.avg_seconds is not None else DEFAULT_SCRAPE_SECONDS
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _current_remaining(self) -> float:
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        # Never estimate less than a second for a job that is still running
+        return max(self.scrape_seconds - elapsed, 1.0)
+
+    def estimated_wait(self) -> float:
+        """Seconds until a newly admitted episode would finish scraping"""
+        return self._current_remaining() + (self.qsize() + 1) * self.scrape_seconds
+
+    def retry_after(self) -> int:
+        """Seconds until admission is expected to succeed again"""
+        wait = 0.0
+        if self.qsize() >= self.maxsize:
+            # A slot frees up when the worker picks up the next item
+            wait = self._current_remaining()
+        overshoot = self.estimated_wait() - self.max_wait
+        if overshoot > 0:
+            wait = max(wait, overshoot)
+        return max(int(math.ceil(wait)), 1)
+
+    def try_put(self, ep_id: str, item) -> bool:
+        """Queue item if admission allows it; returns False when shedding load"""
+        if self.qsize() >= self.maxsize or self.estimated_wait() > self.max_wait:
+            return False
+        self._queue.put_nowait(item)
+        self.queued.add(ep_id)
+        return True
+
+    async def get(self):
+        item = await self._queue.get()
+        self._started = time.monotonic()
+        return item
+
+    def task_done(self, measure: bool = True):
+        """Mark current job finished; measure=False skips jobs that did no scraping"""
+        if self._started is not None and measure:
+            duration = time.monotonic() - self._started
+            if self.avg_seconds is None:
+                self.avg_seconds = duration
+            else:
+                self.avg_seconds = EWMA_ALPHA * duration + (1 - EWMA_ALPHA) * self.avg_seconds
+            self.completed += 1
+        self._started = None
+        self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.qsize(),
+            "max": self.maxsize,
+            "processing": self._started is not None,
+            "avg_scrape_seconds": round(self.scrape_seconds, 1),
+            "estimated_wait_seconds": round(self.estimated_wait(), 1),
+            "completed": self.completed,
+        }
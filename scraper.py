@@ -1,13 +1,23 @@
 # scraper.py - Lazy browser version (closes when not needed)
+# aiohttp and playwright are imported on first use so the API process starts fast
+from __future__ import annotations
+
 import asyncio
 import re
+import time
 import logging
-from typing import Dict
-import aiohttp
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+import os
+from typing import Dict, TYPE_CHECKING
 import random
+from mirror_stats import mirror_stats
+from hedging import extract_timings
+import browser_state
+from page_scanner import LinkScanner, decoder_for, record_fetch
+from intercept import intercept_policy
+from redirects import redirect_cache
+
+if TYPE_CHECKING:
+    import aiohttp
 
 logger = logging.getLogger("scraper")
 logging.basicConfig(level=logging.INFO)
@@ -19,31 +29,141 @@ USER_AGENTS = [
 ]
 
 PREFERRED_SERVERS = ["pixel", "fsl", "10gbps", "server"]
+REVALIDATE_CONCURRENCY = 8
+SAMPLE_BYTES = 256 * 1024   # ranged read used to measure mirror throughput
+SAMPLE_TIMEOUT = 8
+HTTP_MAX_PAGE_BYTES = int(os.getenv("HTTP_MAX_PAGE_BYTES", 1024 * 1024))  # stop reading vcloud pages past this
+HTTP_ENOUGH_LINKS = int(os.getenv("HTTP_ENOUGH_LINKS", 8))  # candidates after which the rest of the page is skipped
+HTTP_CHUNK_BYTES = 16 * 1024
+# Overall wall-clock budget for one scrape_vcloud call (all retries and stages included)
+SCRAPE_BUDGET_SECONDS = float(os.getenv("SCRAPE_BUDGET_SECONDS", 60))
+MIN_STAGE_SECONDS = 1.0      # don't start a stage with less than this left
+MIN_BROWSER_SECONDS = 8.0    # launching Chromium is pointless with less than this left
+MIN_SERVERS = 2              # fewer than this from HTTP -> the browser path is needed
+MAX_BROWSERS = int(os.getenv("MAX_BROWSERS", 1))
+MEMORY_LIMIT_MB = int(os.getenv("MEMORY_LIMIT_MB", 512))
+BROWSER_RSS_MB = 200         # what one lazy Chromium costs (see README memory notes)
 
-# Global playwright reference (NOT browser)
+# Caps concurrent Chromium instances; a hedged browser waits its turn like any other
+_browser_slots = asyncio.Semaphore(MAX_BROWSERS)
+
+# Global playwright reference (NOT browser), started by the first scrape that needs it
 _playwright = None
+_playwright_lock = asyncio.Lock()
+driver_stats = {"started": False, "start_seconds": None}
 
 
-def set_playwright(playwright):
-    """Set global playwright instance from server startup"""
-    global _playwright
-    _playwright = playwright
-    logger.info("Global playwright registered (lazy browser mode)")
+class Deadline:
+    """Time budget for one scrape; every stage takes its timeout from what is left"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self, needed: float = MIN_STAGE_SECONDS) -> bool:
+        return self.remaining() < needed
+
+    def timeout(self, cap: float) -> float:
+        """cap, shrunk to the remaining budget"""
+        return min(cap, self.remaining())
+
+
+def _stage_timeout(deadline, cap: float) -> float:
+    return deadline.timeout(cap) if deadline else cap
+
+
+CHROMIUM_NAMES = ("chrom", "headless_shell")   # /proc comm of Chromium processes
+
+
+def _pid_rss_mb(pid) -> float:
+    """Resident memory of one process in MB (0 if unknown or gone)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _descendants(root: int) -> list:
+    """[(pid, comm)] of every process below root (Playwright driver, Chromium and its helpers)"""
+    children = {}
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return []
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        comm = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append((int(pid), comm))
+    found, stack = [], [root]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child[0])
+    return found
+
+
+def rss_mb() -> float:
+    """Resident memory of this process and all its children (driver + Chromium) in MB"""
+    return _pid_rss_mb("self") + sum(_pid_rss_mb(pid) for pid, _ in _descendants(os.getpid()))
+
+
+def browser_rss_mb() -> float:
+    """Resident memory of the Chromium processes under the Playwright driver (all open browsers)"""
+    return sum(
+        _pid_rss_mb(pid) for pid, comm in _descendants(os.getpid())
+        if any(name in comm.lower() for name in CHROMIUM_NAMES)
+    )
+
+
+def browser_capacity() -> bool:
+    """A speculative browser may start: a slot is free and it fits in the memory limit"""
+    return not _browser_slots.locked() and rss_mb() + BROWSER_RSS_MB <= MEMORY_LIMIT_MB
 
 
 async def get_playwright():
-    """Get or create playwright instance"""
+    """Shared initializer: concurrent first scrapes wait for one driver instead of starting several"""
     global _playwright
-    
-    if not _playwright:
-        _playwright = await async_playwright().start()
-        logger.info("Created new playwright instance")
-    
+    if _playwright:
+        return _playwright
+
+    async with _playwright_lock:
+        if not _playwright:
+            start = time.monotonic()
+            from playwright.async_api import async_playwright
+            _playwright = await async_playwright().start()
+            driver_stats.update(started=True, start_seconds=round(time.monotonic() - start, 2))
+            logger.info(f"Started Playwright driver on first use ({driver_stats['start_seconds']}s)")
     return _playwright
 
 
-async def try_http_extract(session: aiohttp.ClientSession, vcloud_url: str) -> Dict[str,str]:
-    """HTTP extraction with improved reliability"""
+async def stop_playwright():
+    """Stop the driver if a scrape ever started it"""
+    global _playwright
+    async with _playwright_lock:
+        if _playwright:
+            await _playwright.stop()
+            _playwright = None
+            driver_stats["started"] = False
+
+
+async def try_http_extract(session: aiohttp.ClientSession, vcloud_url: str, deadline: Deadline = None) -> Dict[str,str]:
+    """
+    HTTP extraction with improved reliability (returns what was validated if the deadline hits).
+    The page is streamed through an incremental scanner: reading stops once
+    HTTP_ENOUGH_LINKS candidates were seen or after HTTP_MAX_PAGE_BYTES.
+    """
+    import aiohttp
+    scanner = LinkScanner(vcloud_url, PREFERRED_SERVERS)
     try:
         headers = {
             "User-Agent": random.choice(USER_AGENTS),
@@ -52,66 +172,159 @@ async def try_http_extract(session: aiohttp.ClientSession, vcloud_url: str) -> D
             "Connection": "keep-alive"
         }
         
-        timeout = aiohttp.ClientTimeout(total=20)
+        timeout = aiohttp.ClientTimeout(total=_stage_timeout(deadline, 20))
         async with session.get(vcloud_url, headers=headers, timeout=timeout, 
                              allow_redirects=True, ssl=False) as resp:
             if resp.status != 200:
                 logger.debug(f"HTTP fetch returned {resp.status}")
                 return {}
-            text = await resp.text()
+
+            decoder = decoder_for(resp.charset)
+            read = 0
+            enough = capped = False
+            async for chunk in resp.content.iter_chunked(HTTP_CHUNK_BYTES):
+                read += len(chunk)
+                scanner.scan(decoder.decode(chunk))
+                if scanner.candidates >= HTTP_ENOUGH_LINKS:
+                    enough = True
+                    break
+                if read >= HTTP_MAX_PAGE_BYTES:
+                    capped = True
+                    logger.info(f"HTTP fetch of {vcloud_url} hit the {HTTP_MAX_PAGE_BYTES} byte cap")
+                    break
+            scanner.scan(decoder.decode(b"", final=True))
+            scanner.finish()
+            record_fetch(vcloud_url, read, resp.content_length, enough, capped)
     except Exception as e:
         logger.debug(f"HTTP fetch error: {e}")
         return {}
 
-    soup = BeautifulSoup(text, "html.parser")
-
     # Find server links
-    links = {}
-    for a in soup.select("a"):
-        href = a.get("href")
-        if not href:
-            continue
-        href_str = str(href)
-        text = str(a.get_text() or "").lower()
-        if any(k in text for k in PREFERRED_SERVERS) or any(k in href_str.lower() for k in PREFERRED_SERVERS):
-            links[text.strip() or href_str] = urljoin(vcloud_url, href_str)
+    links = dict(scanner.links)
 
     # Regex fallback
-    if not links:
-        for match in re.finditer(r"(https?://[^\s'\"<>]+(?:pixeldrain|fsl|10gbps|pixelserver|vcloud)[^\s'\"<>]*)", text, re.IGNORECASE):
-            url = match.group(1)
-            links["auto"] = url
+    if not links and scanner.raw_urls:
+        links["auto"] = scanner.raw_urls[-1]
 
     # Validate links
     valid = {}
     if links:
         for name, link in links.items():
-            try:
-                async with session.head(link, timeout=aiohttp.ClientTimeout(total=10), headers=headers, allow_redirects=True) as h:
-                    if h.status in (200, 302, 303, 307):
-                        valid[name] = link
-                        continue
-            except Exception:
-                pass
+            if deadline and deadline.expired():
+                logger.info(f"Scrape budget exhausted after validating {len(valid)}/{len(links)} links")
+                break
+            if await validate_link(session, link, headers, deadline=deadline):
+                valid[name] = link
+                
+    return valid
 
+
+async def sample_link(session: aiohttp.ClientSession, link: str, headers: dict, deadline: Deadline = None) -> bool:
+    """Short ranged read that records TTFB and throughput for the link's host"""
+    import aiohttp
+    range_headers = {**headers, "Range": f"bytes=0-{SAMPLE_BYTES - 1}"}
+    start = time.monotonic()
+    timeout = aiohttp.ClientTimeout(total=_stage_timeout(deadline, SAMPLE_TIMEOUT))
+    try:
+        async with session.get(link, timeout=timeout, headers=range_headers, allow_redirects=True) as g:
+            ttfb = time.monotonic() - start
+            if g.status not in (200, 206):
+                return False
+            # Remember where the redirect chain ended so players can skip it
+            redirect_cache.record(link, str(g.url), g.headers)
+
+            received = 0
+            body_start = time.monotonic()
             try:
-                range_headers = {**headers, "Range": "bytes=0-1023"}
-                async with session.get(link, timeout=aiohttp.ClientTimeout(total=12), headers=range_headers, allow_redirects=True) as g:
-                    if g.status in (200, 206, 302, 303):
-                        valid[name] = link
+                async for chunk in g.content.iter_chunked(64 * 1024):
+                    received += len(chunk)
+                    if received >= SAMPLE_BYTES:
+                        break
             except Exception:
-                pass
-                
-    return valid
+                pass  # slow mirror hit the timeout - what we got is still a valid sample
+
+            mirror_stats.record(link, ttfb, received, time.monotonic() - body_start)
+            return True
+    except Exception:
+        return False
+
+
+async def validate_link(session: aiohttp.ClientSession, link: str, headers: dict = None, measure: bool = True,
+                        deadline: Deadline = None) -> bool:
+    """Check a direct link is still alive (speed sample, then HEAD, then a tiny ranged GET)"""
+    headers = headers or {"User-Agent": random.choice(USER_AGENTS)}
+    if measure and await sample_link(session, link, headers, deadline):
+        return True
+
+    if await _probe_link(session, link, headers, deadline):
+        return True
+
+    # A probe cut short by the scrape budget says nothing about the mirror
+    if measure and not (deadline and deadline.expired()):
+        mirror_stats.record_failure(link)
+    return False
+
+
+async def _probe_link(session: aiohttp.ClientSession, link: str, headers: dict, deadline: Deadline = None) -> bool:
+    import aiohttp
+    if deadline and deadline.expired():
+        return False
+    try:
+        timeout = aiohttp.ClientTimeout(total=_stage_timeout(deadline, 10))
+        async with session.head(link, timeout=timeout, headers=headers, allow_redirects=True) as h:
+            if h.status in (200, 302, 303, 307):
+                if h.status == 200:
+                    redirect_cache.record(link, str(h.url), h.headers)
+                return True
+    except Exception:
+        pass
 
+    if deadline and deadline.expired():
+        return False
+    try:
+        range_headers = {**headers, "Range": "bytes=0-1023"}
+        timeout = aiohttp.ClientTimeout(total=_stage_timeout(deadline, 12))
+        async with session.get(link, timeout=timeout, headers=range_headers, allow_redirects=True) as g:
+            if g.status in (200, 206, 302, 303):
+                return True
+    except Exception:
+        pass
+
+    return False
+
+
+async def revalidate_links(servers: Dict[str, str], concurrency: int = REVALIDATE_CONCURRENCY) -> Dict[str, str]:
+    """Concurrently re-check cached servers and return only the ones still alive"""
+    if not servers:
+        return {}
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"User-Agent": random.choice(USER_AGENTS)}
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
+        async def check(name, link):
+            async with semaphore:
+                return name, link, await validate_link(session, link, headers)
 
-async def playwright_extract(vcloud_url: str, timeout=20000) -> Dict[str, str]:
+        results = await asyncio.gather(*(check(n, l) for n, l in servers.items()))
+
+    alive = {name: link for name, link, ok in results if ok}
+    if len(alive) < len(servers):
+        logger.info(f"Revalidation: {len(servers) - len(alive)}/{len(servers)} servers dead")
+    return alive
+
+
+async def playwright_extract(vcloud_url: str, timeout=20000, deadline: Deadline = None) -> Dict[str, str]:
     """
     Playwright extraction using LAZY browser (created per-call, destroyed after)
     This saves ~200MB RAM when not scraping
+    Navigation and click waits shrink to the deadline; whatever was found by then is returned.
     """
+    from playwright.async_api import TimeoutError as PlaywrightTimeout
     browser = None
     context = None
+    slot_held = False
     results = {}
     
     try:
@@ -122,8 +335,14 @@ async def playwright_extract(vcloud_url: str, timeout=20000) -> Dict[str, str]:
         
         # Get playwright and create TEMPORARY browser
         pw = await get_playwright()
+        if deadline:
+            await asyncio.wait_for(_browser_slots.acquire(), deadline.remaining())
+        else:
+            await _browser_slots.acquire()
+        slot_held = True
         browser = await pw.chromium.launch(
             headless=True,
+            timeout=max(_stage_timeout(deadline, 30) * 1000, 1),  # 0 would mean "no timeout"
             args=[
                 "--no-sandbox",
                 "--disable-setuid-sandbox",
@@ -134,31 +353,50 @@ async def playwright_extract(vcloud_url: str, timeout=20000) -> Dict[str, str]:
         )
         logger.info("🚀 Lazy browser launched (will close after scrape)")
         
+        # Seed cookies/localStorage from the last successful visit to this host so
+        # consent / "generate link" interstitials it remembers are not repeated
+        state = await browser_state.load(vcloud_url)
         context = await browser.new_context(
             user_agent=random.choice(USER_AGENTS),
-            viewport={"width": 1280, "height": 720}
+            viewport={"width": 1280, "height": 720},
+            storage_state=state
         )
         page = await context.new_page()
 
-        # Block resources
-        await page.route("**/*.{png,jpg,jpeg,gif,svg,css,woff,woff2}", lambda r: r.abort())
-        await page.route("**/ads/**", lambda r: r.abort())
-        await page.route("**/analytics/**", lambda r: r.abort())
+        # Block resources (per-host policy, one route handler - see intercept.py)
+        await intercept_policy.attach(page, vcloud_url)
+        page_start = time.monotonic()
+
+        def wait_ms(cap_ms):
+            return int(_stage_timeout(deadline, cap_ms / 1000) * 1000)
 
-        await page.goto(vcloud_url, wait_until="domcontentloaded", timeout=timeout)
+        try:
+            await page.goto(vcloud_url, wait_until="domcontentloaded", timeout=max(wait_ms(timeout), 1))
+        except PlaywrightTimeout:
+            if not deadline:
+                raise
+            # Out of budget: harvest whatever has rendered so far
+            logger.warning("Navigation hit the scrape deadline; extracting partial page")
+
+        clicks_skipped = bool(state) and await _server_links_visible(page)
+        if clicks_skipped:
+            browser_state.stats["clicks_skipped"] += 1
 
         # Try clicking buttons
         for t in ["generate", "get link", "download", "create link", "start", "watch"]:
+            if clicks_skipped or (deadline and deadline.expired()):
+                break
             try:
                 btn = await page.query_selector(f"text={t}")
                 if btn:
-                    await btn.click()
-                    await page.wait_for_timeout(1500)
+                    await btn.click(timeout=max(wait_ms(5000), 1))
+                    await page.wait_for_timeout(wait_ms(1500))
                     break
             except Exception:
                 continue
 
-        await page.wait_for_timeout(1500)
+        if not clicks_skipped:
+            await page.wait_for_timeout(wait_ms(1500))
 
         # Extract from anchors
         anchors = await page.query_selector_all("a")
@@ -181,6 +419,18 @@ async def playwright_extract(vcloud_url: str, timeout=20000) -> Dict[str, str]:
         for match in re.finditer(r"(https?://[^\s'\"<>]+(?:pixeldrain|fsl|pixel|10gbps|vcloud)[^\s'\"<>]*)", html, re.IGNORECASE):
             results[match.group(1)[:40]] = match.group(1)
 
+        # Measured while this page is still open; with MAX_BROWSERS > 1 it includes concurrent browsers
+        intercept_policy.record_scrape(vcloud_url, time.monotonic() - page_start, browser_rss_mb())
+
+        try:
+            if results:
+                await browser_state.save(vcloud_url, await context.storage_state())
+            elif state:
+                # Remembered state did not help (or broke the page); start clean next time
+                await browser_state.forget(vcloud_url)
+        except Exception as e:
+            # Never lose links already extracted over cookies (e.g. the page crashed)
+            logger.warning(f"Browser state update failed for {vcloud_url}: {e}")
         return results
 
     except Exception as e:
@@ -202,50 +452,147 @@ async def playwright_extract(vcloud_url: str, timeout=20000) -> Dict[str, str]:
             except Exception as e:
                 logger.error(f"Error closing browser: {e}")
 
+        if slot_held:
+            _browser_slots.release()
+
+
+async def _http_stage(url: str, deadline: Deadline) -> Dict[str, str]:
+    """try_http_extract with preferred servers first; records the host's HTTP timing"""
+    import aiohttp
+    start = time.monotonic()
+    ordered = {}
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
+            try:
+                http_res = await try_http_extract(session, url, deadline)
+                if http_res:
+                    for k in PREFERRED_SERVERS:
+                        for key, link in list(http_res.items()):
+                            if k in key.lower() or k in link.lower():
+                                ordered[key] = link
+                                http_res.pop(key, None)
+                    ordered.update(http_res)
+                    logger.info(f"HTTP extraction: found {len(ordered)} servers")
+            except Exception as e:
+                logger.debug(f"HTTP extraction failed: {e}")
+    finally:
+        # Also runs when a hedged browser won and cancelled us: that run failed and
+        # took at least this long, otherwise the learned p90 would be biased low
+        extract_timings.record(url, time.monotonic() - start, len(ordered) >= MIN_SERVERS)
+    return ordered
 
-async def scrape_vcloud(url: str, prefer_fast=True, max_retries=2) -> Dict[str,str]:
+
+async def _hedged_extract(url: str, deadline: Deadline) -> Dict[str, str]:
+    """
+    Start HTTP; if it has not produced MIN_SERVERS after the host's hedge delay,
+    start the browser alongside it. The first path reaching MIN_SERVERS wins and
+    the other is cancelled; if neither does, their results are merged.
+    """
+    delay = extract_timings.hedge_delay(url)
+    http_task = asyncio.create_task(_http_stage(url, deadline))
+    done, _ = await asyncio.wait({http_task}, timeout=min(delay, deadline.remaining()))
+    if done and len(http_task.result()) >= MIN_SERVERS:
+        return http_task.result()
+
+    if deadline.expired(MIN_BROWSER_SECONDS) or (not done and not browser_capacity()):
+        # No room for a second Chromium right now - behave like the sequential path
+        if not done:
+            extract_timings.count("skipped_no_capacity")
+        results = await http_task
+        if len(results) < MIN_SERVERS and not deadline.expired(MIN_BROWSER_SECONDS):
+            results = {**results, **await playwright_extract(url, deadline=deadline)}
+        return results
+
+    if not done:
+        extract_timings.count("hedged")
+        logger.info(f"HTTP slower than {delay:.1f}s for {url}; hedging with the browser")
+    browser_task = asyncio.create_task(playwright_extract(url, deadline=deadline))
+    pending = {browser_task} if done else {http_task, browser_task}
+    merged = dict(http_task.result()) if done else {}
+
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, timeout=deadline.remaining(),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+            if not finished:
+                break  # deadline: keep what we have
+            for task in finished:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    logger.debug(f"Hedged extraction path failed: {e}")
+                    continue
+                merged.update(result)
+                if len(result) >= MIN_SERVERS:
+                    extract_timings.count("http_won" if task is http_task else "browser_won")
+                    return merged
+        extract_timings.count("merged")
+        return merged
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Let the browser's finally-block close Chromium before we return
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _server_links_visible(page) -> bool:
+    """Page already lists mirror links (no button needs clicking)"""
+    try:
+        texts = await page.eval_on_selector_all(
+            "a[href]", "els => els.map(e => (e.innerText + ' ' + e.href).toLowerCase())")
+    except Exception:
+        return False
+    return any(k in t for t in texts for k in PREFERRED_SERVERS + ["pixeldrain"])
+
+
+async def scrape_vcloud(url: str, prefer_fast=True, max_retries=2, budget: float = SCRAPE_BUDGET_SECONDS) -> Dict[str,str]:
     """
     Main scraping orchestrator with lazy browser
     - Tries HTTP first (0 MB overhead)
-    - Only launches browser if needed
+    - Only launches browser if needed (or races it against HTTP for hosts
+      where HTTP is unreliable, see hedging.py)
     - Always closes browser after use
+    - Whole call (retries included) runs against a `budget`-second deadline;
+      partial results are returned when it runs out
     """
     final_results = {}
+    deadline = Deadline(budget)
     
     for attempt in range(max_retries):
         if attempt > 0:
+            if deadline.expired(2 + MIN_STAGE_SECONDS):
+                break
             logger.info(f"Retry attempt {attempt + 1} for {url}")
             await asyncio.sleep(2)
         
+        # Hosts where HTTP often comes up short race the browser instead of waiting for it
+        if extract_timings.should_hedge(url) and not deadline.expired(MIN_BROWSER_SECONDS):
+            final_results.update(await _hedged_extract(url, deadline))
+            if len(final_results) >= 1 or deadline.expired():
+                break
+            continue
+
         # Try HTTP extraction first (no browser = 0 MB)
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            try:
-                http_res = await try_http_extract(session, url)
-                if http_res:
-                    ordered = {}
-                    for k in PREFERRED_SERVERS:
-                        for key, link in list(http_res.items()):
-                            if k in key.lower() or k in link.lower():
-                                ordered[key] = link
-                                http_res.pop(key, None)
-                    ordered.update(http_res)
-                    final_results.update(ordered)
-                    logger.info(f"HTTP extraction: found {len(final_results)} servers")
-            except Exception as e:
-                logger.debug(f"HTTP extraction failed: {e}")
+        final_results.update(await _http_stage(url, deadline))
 
         # Only use Playwright if we need more servers
-        if len(final_results) < 2:
+        if len(final_results) < MIN_SERVERS and deadline.expired(MIN_BROWSER_SECONDS):
+            logger.info(f"Skipping browser: only {deadline.remaining():.1f}s of scrape budget left")
+        elif len(final_results) < MIN_SERVERS:
             try:
                 logger.info("Launching browser for additional scraping...")
-                playwright_res = await playwright_extract(url)
+                playwright_res = await playwright_extract(url, deadline=deadline)
                 final_results.update(playwright_res)
                 logger.info(f"Playwright extraction: added {len(playwright_res)} servers")
             except Exception as e:
                 logger.debug(f"Playwright extraction failed: {e}")
         
-        if len(final_results) >= 1:
+        if len(final_results) >= 1 or deadline.expired():
             break
     
-    logger.info(f"Scraping completed: found {len(final_results)} servers total")
+    elapsed = deadline.seconds - deadline.remaining()
+    if deadline.expired():
+        logger.warning(f"Scrape budget ({budget:.0f}s) exhausted for {url}; returning {len(final_results)} servers")
+    logger.info(f"Scraping completed: found {len(final_results)} servers total in {elapsed:.1f}s")
     return final_results
\ No newline at end of file
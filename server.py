@@ -1,5 +1,8 @@
 # server.py - Fixed version with proper global browser and queue system
 import os
+import json
+import uuid
+import csv
 import uvicorn
 import asyncio
 import scraper
@@ -9,85 +12,126 @@ from pathlib import Path
 from typing import Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Query, HTTPException, Form
+from fastapi import FastAPI, Query, HTTPException, Form, Request, BackgroundTasks
 # server.py - Fix imports at the top
 from datetime import datetime, timedelta, timezone
 from fastapi.middleware.cors import CORSMiddleware
-from playwright.async_api import async_playwright
-from auto_scraper import auto_scraper, check_episode_servers
-from fastapi.responses import HTMLResponse, JSONResponse
+from auto_scraper import auto_scraper, server_info_from_cache, summarize_episode
+from worker import prefetch_loop
+import linkcache
+import browser_state
+from payloads import PayloadCache
+from assets import asset_pipeline, ASSET_DIR
+import bulk_import
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 
 from db import (
     episodes_collection,
     cache_collection,  # Make sure this line is present
-    add_episode, get_episode,
-    get_cached, set_cached
+    add_episode, get_episode, search_episodes,
+    ensure_indexes, backfill_episode_fields, backfill_hit_expiry, migrate_cache_links,
+    bulk_add_episodes, latest_scrape_after, jobs_collection,
+    get_cached, get_cached_doc, remove_cached_server, record_view, set_cached_quality,
+    scrape_requests_collection, scrape_status_collection,
+    hits_collection, decayed_score, remove_episode, rebuild_show_health, get_show_health
+)
+from leader import leader_lease
+from pymongo.errors import DuplicateKeyError
+from refresh import refresh_episode, REFRESH_MODES
+from events import episode_events, format_sse
+from mirror_stats import mirror_stats
+from links import cache_records, canonical_url, MIN_SERVERS_REQUIRED
+from page_scanner import fetch_stats
+from intercept import intercept_policy
+from redirects import redirect_cache, serve_url
+import relay
+from hedging import extract_timings
+from beacons import beacon_tracker, parse_beacon_events, client_address
+from scrape_queue import (
+    ScrapeQueue, ExpiringDict, remote_retry_after,
+    SCRAPE_COOLDOWN_SECONDS, COOLDOWN_MAX_ENTRIES
 )
-from scraper import scrape_vcloud
 
 logger = logging.getLogger("server")
 logging.basicConfig(level=logging.INFO)
 
-# Global Playwright/browser references
-_global_playwright = None
-_global_browser = None
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+FORWARD_POLL_SECONDS = 2  # how often the leader claims scrapes forwarded by other workers
+
+# Serialized + compressed /get_link bodies, one version per episode
+payload_cache = PayloadCache()
+
+async def _run_migrations():
+    """Each step is independent: one failing (e.g. an index conflict) must not skip the rest"""
+    for step in (ensure_indexes, backfill_episode_fields, backfill_hit_expiry, migrate_cache_links, rebuild_show_health):
+        try:
+            await step()
+        except Exception as e:
+            logger.exception(f"Startup step {step.__name__} failed: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """LAZY BROWSER: Only keep playwright alive, not browser"""
-    global _global_playwright
-    
-    # STARTUP
-    logger.info("Starting Playwright (lazy browser mode)...")
+    """LAZY BROWSER: the Playwright driver starts on the first scrape that needs it (scraper.get_playwright)"""
+    # STARTUP - index setup and migrations run in the background so readiness never waits on them
+    migrations_task = asyncio.create_task(_run_migrations())
 
-    try:
-        _global_playwright = await async_playwright().start()
-        
-        # Register playwright in scraper.py (NOT browser)
-        scraper.set_playwright(_global_playwright)
-        logger.info("✅ Global playwright registered (lazy browser mode)")
-        
-    except Exception as e:
-        logger.exception(f"Failed to start playwright: {e}")
+    if relay.RELAY_ENABLED:
+        relay.prefix_cache.load()
 
     # Initialize app state
     app.state.scrape_lock = asyncio.Lock()
-    app.state.scrape_queue = asyncio.Queue()
-    app.state.queued_episodes = set()
+    app.state.scrape_queue = ScrapeQueue()
+    app.state.leader_tasks = []
+    app.state.event_mirror = asyncio.Queue()
 
     # Start background tasks (NO browser heartbeat needed)
-    task_auto = asyncio.create_task(auto_scraper.run_auto_scraper())
+    # Only the lease holder runs the sweeper/prefetcher; with uvicorn --workers N the
+    # others just serve requests and forward scrapes to it through Mongo
     queue_task = asyncio.create_task(_queue_worker(app))
+    lease_task = asyncio.create_task(leader_lease.run(
+        lambda: _start_leader_tasks(app),
+        lambda: _stop_leader_tasks(app),
+        info=lambda: {"queue": app.state.scrape_queue.stats()},
+    ))
+    background = [migrations_task, queue_task, lease_task]
+    if leader_lease.enabled:
+        episode_events.add_listener(app.state.event_mirror.put_nowait)
+        background.append(asyncio.create_task(_mirror_events(app)))
 
     yield  # Application running
 
     # SHUTDOWN
     logger.info("Shutting down background tasks...")
-    auto_scraper.stop()
+    await _stop_leader_tasks(app)
     
     # Cancel background tasks
-    task_auto.cancel()
-    queue_task.cancel()
+    for task in background:
+        task.cancel()
     
     # Wait for tasks to finish
-    await asyncio.gather(task_auto, queue_task, return_exceptions=True)
+    await asyncio.gather(*background, return_exceptions=True)
 
     try:
-        if _global_playwright:
-            await _global_playwright.stop()
+        # Hand over immediately instead of making the next leader wait for the lease to lapse
+        await leader_lease.release()
     except Exception as e:
-        logger.warning(f"Error stopping playwright: {e}")
+        logger.warning(f"Error releasing leader lease: {e}")
 
-    # Unset in scraper
-    scraper.set_playwright(None)
+    await relay.close_session()
+
+    try:
+        await scraper.stop_playwright()
+    except Exception as e:
+        logger.warning(f"Error stopping playwright: {e}")
 
 # Initialize FastAPI with lifespan
 app = FastAPI(lifespan=lifespan)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="."), name="static")
+# Mount static files (asset directory only - never the project root with source code)
+app.mount("/static", StaticFiles(directory=str(ASSET_DIR)), name="static")
 
 # CORS
 app.add_middleware(
@@ -99,18 +143,111 @@ app.add_middleware(
 )
 
 
+async def _start_leader_tasks(app):
+    """Background work that must run in exactly one process"""
+    tasks = [
+        asyncio.create_task(auto_scraper.run_auto_scraper()),
+        asyncio.create_task(_claim_forwarded_scrapes(app)),
+    ]
+    if PREFETCH_ENABLED:
+        # Shares the scrape lock so prefetch never runs a second browser next to a queued scrape
+        tasks.append(asyncio.create_task(prefetch_loop(app.state.scrape_lock)))
+    app.state.leader_tasks = tasks
+
+
+async def _stop_leader_tasks(app):
+    auto_scraper.stop()
+    tasks, app.state.leader_tasks = app.state.leader_tasks, []
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _claim_forwarded_scrapes(app):
+    """Leader only: move scrapes forwarded by non-leader workers into the local queue"""
+    q = app.state.scrape_queue
+    while True:
+        try:
+            while q.qsize() < q.maxsize:
+                doc = await scrape_requests_collection.find_one_and_delete({}, sort=[("createdAt", 1)])
+                if not doc:
+                    break
+                ep_id = doc["_id"]
+                if ep_id in q.queued:
+                    continue
+                item = (ep_id, doc["show"], doc["ep"], doc.get("mode", "incremental"), doc.get("qualities"))
+                if not q.try_put(ep_id, item):
+                    try:
+                        await scrape_requests_collection.insert_one(doc)  # put it back for later
+                    except DuplicateKeyError:
+                        pass
+                    break
+                episode_events.publish(ep_id, "queued", position=q.qsize())
+        except Exception as e:
+            logger.exception(f"Forwarded scrape claim error: {e}")
+        await asyncio.sleep(FORWARD_POLL_SECONDS)
+
+
+async def _mirror_events(app):
+    """Copy scrape progress events to Mongo (in order) so SSE clients on other workers see them"""
+    q = app.state.event_mirror
+    while True:
+        event = await q.get()
+        try:
+            await scrape_status_collection.update_one(
+                {"_id": event["episode"]},
+                {"$set": {"event": event, "updatedAt": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mirror scrape event: {e}")
+
+
+async def enqueue_scrape(ep_id: str, show: str, ep: int, mode: str = "incremental", qualities=None):
+    """
+    Queue a scrape locally (leader) or forward it to the leader through Mongo.
+    Returns (status, seconds): "queued" + estimated wait, "already_queued", or
+    "busy" + Retry-After seconds.
+    """
+    q = app.state.scrape_queue
+    if leader_lease.is_leader:
+        if ep_id in q.queued:
+            return "already_queued", None
+        # Shed load when the queue cannot finish this scrape in reasonable time
+        if not q.try_put(ep_id, (ep_id, show, ep, mode, qualities)):
+            return "busy", q.retry_after()
+        episode_events.publish(ep_id, "queued", position=q.qsize())
+        return "queued", round(q.estimated_wait())
+
+    # Non-leader: admission uses the queue stats the leader publishes on its lease
+    lease = await leader_lease.current()
+    pending = await scrape_requests_collection.count_documents({})
+    retry_after = remote_retry_after((lease or {}).get("queue", {}), pending)
+    if retry_after:
+        return "busy", retry_after
+    try:
+        await scrape_requests_collection.insert_one({
+            "_id": ep_id, "show": show, "ep": ep, "mode": mode, "qualities": qualities,
+            "createdAt": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        return "already_queued", None
+    return "queued", None
+
+
 async def _queue_worker(app):
     """
     Queue worker that processes scrapes one by one - PER EPISODE cooldown
     """
     q = app.state.scrape_queue
-    queued_set = app.state.queued_episodes
+    queued_set = q.queued
 
     while True:
         ep_id = None
+        scraped_any = False
         try:
-            ep_id, show, ep = await q.get()
-            logger.info(f"⭕ Queue worker: processing {ep_id}")
+            ep_id, show, ep, mode, only = await q.get()
+            logger.info(f"⭕ Queue worker: processing {ep_id} ({mode}{', ' + '/'.join(only) if only else ''})")
 
             # Remove from queued set now that we're processing
             queued_set.discard(ep_id)
@@ -120,31 +257,38 @@ async def _queue_worker(app):
                 doc = await get_episode(ep_id)
                 if not doc:
                     logger.warning(f"Episode missing in queue_worker: {ep_id}")
+                    episode_events.publish(ep_id, "failed", message="Episode not found")
                     continue
 
-                master = doc.get("master", {})
-                scraped = {}
+                qualities = [q for q in doc.get("master", {}) if not only or q in only]
+                scraped_any = bool(qualities)
+                episode_events.publish(ep_id, "started", qualities=qualities, mode=mode)
+                done = []
 
-                for quality, url in master.items():
-                    try:
-                        logger.info(f"⭕ Scraping {quality}p from {url}")
-                        res = await scrape_vcloud(url)
-                        scraped[quality] = res or {}
-                        logger.info(f"✅ {quality}p -> {len(scraped[quality])} servers")
-                    except Exception as e:
-                        logger.error(f"❌ {quality}p error: {e}")
-                        scraped[quality] = {}
+                async def on_quality(quality, servers, scraped):
+                    # Each quality is cached as soon as it finishes so listeners can play it right away
+                    done.append(quality)
+                    episode_events.publish(ep_id, "quality", quality=quality, servers=len(servers),
+                                           scraped=scraped,
+                                           remaining=[q for q in qualities if q not in done])
 
                 # Increase cache TTL to 6 hours (21600 seconds)
-                await set_cached(ep_id, scraped, ttl=21600)
-                logger.info(f"✅ Queue worker: cached results for {ep_id}")
+                results = await refresh_episode(ep_id, mode=mode, ttl=21600, qualities=only,
+                                                on_quality=on_quality)
+                total = sum(len(v) for v in (results or {}).values())
+
+                logger.info(f"✅ Queue worker: cached results for {ep_id} ({mode})")
+                episode_events.publish(ep_id, "done", servers=total)
 
         except Exception as e:
             logger.exception(f"Queue worker loop error: {e}")
+            if ep_id:
+                episode_events.publish(ep_id, "failed", message=str(e))
         finally:
             if ep_id:
                 queued_set.discard(ep_id)  # Ensure it's removed even on error
-            q.task_done()
+            # Only real scrapes feed the throughput estimate used for admission
+            q.task_done(measure=scraped_any)
 
 
 # ------------------- Routes -------------------
@@ -154,331 +298,30 @@ async def root():
     return {"status": "ok", "msg": "WebPlayer running"}
 
 
-@app.get("/player", response_class=HTMLResponse)
-async def player_page(show: str = Query(...), ep: int = Query(...)):
-    """Serve the player HTML"""
-    html_content = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <title>KDRAMA Player</title>
-  <style>
-    body { margin:0; font-family:Arial, sans-serif; background:#111; color:#fff; }
-    .topbar { display:flex; justify-content:space-between; align-items:center;
-      padding:12px; background:#000; }
-    .branding { display:flex; align-items:center; gap:8px; }
-    .branding span { background:#2a9df4; padding:6px 10px; border-radius:4px; font-weight:bold; }
-    .channel { font-size:18px; font-weight:bold; }
-    .btn { background:#222; padding:6px 10px; margin-left:6px; border:1px solid #333;
-           border-radius:4px; cursor:pointer; color:#fff; text-decoration:none; display:inline-block; }
-    .btn:hover { background:#333; }
-    .video-container { max-width:950px; margin:20px auto; }
-    .servers, .downloads { max-width:950px; margin:10px auto; }
-    .servers button, .downloads button, .downloads a {
-      margin:5px; padding:6px 12px; border-radius:6px; background:#333; color:#fff;
-      border:none; cursor:pointer; text-decoration:none; display:inline-block;
-    }
-    .servers button:hover, .downloads button:hover, .downloads a:hover { background:#444; }
-    .servers button.active { background:#2a9df4; }
-    .downloads a { background:#2d5a2d; }
-    .downloads a:hover { background:#3d6a3d; }
-    .error { color:#f66; margin-top:6px; }
-    .status { color:#4a9; margin:10px; }
-    .server-count { color:#4a9; font-size:14px; margin:5px 0; }
-    .warning { color:#ff9500; margin:10px; padding:8px; background:#2a1f0a; border-radius:4px; }
-    #videoPlayer { width: 100%; height: 500px; }
-
-    /* Popup styles */
-    .popup {
-        display: none;
-        position: fixed;
-        top: 50%;
-        left: 50%;
-        transform: translate(-50%, -50%);
-        background-color: rgba(0, 0, 0, 0.9);
-        color: white;
-        padding: 20px;
-        border-radius: 10px;
-        z-index: 1000;
-        text-align: center;
-        box-shadow: 0 0 20px rgba(0, 0, 0, 0.5);
-        max-width: 400px;
-    }
+def _asset_response(request: Request, asset):
+    """Send a precompressed asset variant, or 304 if the client already has it"""
+    body, encoding, etag = asset.payload.negotiate(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if asset.payload.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
 
-    .popup h3 {
-        margin-top: 0;
-        color: #2a9df4;
-    }
 
-    .popup button {
-        background-color: #2a9df4;
-        color: white;
-        border: none;
-        padding: 10px 20px;
-        border-radius: 5px;
-        cursor: pointer;
-        margin-top: 15px;
-    }
-
-    .popup button:hover {
-        background-color: #1e78c8;
-    }
-  </style>
-  <link href="https://vjs.zencdn.net/7.21.1/video-js.css" rel="stylesheet">
-</head>
-<body>
-  <div class="topbar">
-    <div class="branding">
-      <span>🤗🤗🙂</span>
-      <div class="channel">KDRAMA Player</div>
-    </div>
-    <div class="utils">
-      <button class="btn" onclick="openDirect()">Open Direct</button>
-      <button class="btn" onclick="openVLC()">Play in VLC</button>
-      <button class="btn" onclick="forceScrap()">Force Scrape</button>
-      <button class="btn" onclick="refreshPage()">Refresh</button>
-    </div>
-  </div>
-  <div class="video-container">
-    <video id="videoPlayer" class="video-js vjs-default-skin" controls preload="auto" width="950" height="500"></video>
-  </div>
-  <div class="servers">
-    <h3>Servers</h3>
-    <div id="server-count" class="server-count"></div>
-    <div id="servers"></div>
-    <div id="status" class="status"></div>
-    <div id="warning" class="warning" style="display:none;"></div>
-  </div>
-  <div class="downloads">
-    <h3>Download</h3>
-    <div id="downloads"></div>
-  </div>
-
-  <!-- Cooldown Popup -->
-  <div id="cooldownPopup" class="popup">
-      <h3>🕒 Please Be Patient</h3>
-      <p>Our system is working hard to fetch the best links for you.</p>
-      <p id="cooldownMessage">You can force scrape again in <span id="cooldownTime">10:00</span> minutes.</p>
-      <button onclick="closePopup()">OK</button>
-  </div>
-
-  <script src="https://vjs.zencdn.net/7.21.1/video.min.js"></script>
-  <script>
-    let currentLink = null;
-    let player = null;
-    let cooldownInterval;
-
-    function showCooldownPopup(minutes) {
-        const popup = document.getElementById('cooldownPopup');
-        const cooldownTimeElement = document.getElementById('cooldownTime');
-        cooldownTimeElement.textContent = `${Math.floor(minutes)}:00`;
-        popup.style.display = 'block';
-
-        // Clear any existing interval
-        if (cooldownInterval) {
-            clearInterval(cooldownInterval);
-        }
-
-        let remainingTime = minutes * 60; // Convert to seconds
-
-        cooldownInterval = setInterval(() => {
-            remainingTime--;
-            let displayMinutes = Math.floor(remainingTime / 60);
-            let displaySeconds = remainingTime % 60;
-            cooldownTimeElement.textContent = `${displayMinutes}:${displaySeconds < 10 ? '0' : ''}${displaySeconds}`;
-
-            if (remainingTime <= 0) {
-                clearInterval(cooldownInterval);
-                notifyCooldownOver();
-            }
-        }, 1000);
-    }
-
-    function notifyCooldownOver() {
-        alert("Cooldown is over! You can now force scrape again.");
-        closePopup();
-    }
-
-    function closePopup() {
-        document.getElementById('cooldownPopup').style.display = 'none';
-    }
-
-    async function loadEpisode() {
-      // Existing loadEpisode function
-      try {
-        const params = new URLSearchParams(window.location.search);
-        const show = params.get("show");
-        const ep = params.get("ep");
-        if (!show || !ep) {
-          document.getElementById("servers").innerText = "💦 Missing show/ep params";
-          return;
-        }
-        document.getElementById("status").innerText = "Loading episode data...";
-
-        const res = await fetch(`/get_link?show=${encodeURIComponent(show)}&ep=${encodeURIComponent(ep)}`);
-        if (!res.ok) {
-          throw new Error(`HTTP ${res.status}: ${res.statusText}`);
-        }
-
-        let data = await res.json();
-        console.log("Episode data:", data);
-        const serversDiv = document.getElementById("servers");
-        const downloadsDiv = document.getElementById("downloads");
-        const statusDiv = document.getElementById("status");
-        const serverCountDiv = document.getElementById("server-count");
-        const warningDiv = document.getElementById("warning");
-
-        serversDiv.innerHTML = "";
-        downloadsDiv.innerHTML = "";
-        warningDiv.style.display = "none";
-        if (data.server_info) {
-            serverCountDiv.innerText = `Servers: ${data.server_info.server_count}/9`;
-
-            if (data.server_info.needs_force_scrape) {
-                warningDiv.innerText = data.server_info.message;
-                warningDiv.style.display = "block";
-            }
-        }
-        if (!player) {
-          player = videojs("videoPlayer", {
-            fluid: true,
-            responsive: true,
-            playbackRates: [0.5, 1, 1.25, 1.5, 2]
-          });
-        }
-        let links = {};
-        if (data.status === "cached" && data.links) {
-          links = data.links;
-          statusDiv.innerText = "✅ Cached links loaded";
-        } else if (data.status === "master" && data.links) {
-          statusDiv.innerText = "⚠️ Only master links found. Click 'Force Scrape' to get direct links.";
-          for (const [quality, masterUrl] of Object.entries(data.links)) {
-            const btn = document.createElement("button");
-            btn.innerText = `${quality}p (Master)`;
-            btn.onclick = () => {
-              currentLink = masterUrl;
-              player.src({ src: masterUrl, type: "video/mp4" });
-              player.ready(() => player.play());
-            };
-            serversDiv.appendChild(btn);
-          }
-          return;
-        } else {
-          statusDiv.innerText = "💢 No links found";
-          return;
-        }
-        let hasAnyServers = false;
-        for (const [quality, servers] of Object.entries(links)) {
-          if (!servers || typeof servers !== 'object') continue;
-          for (const [serverName, link] of Object.entries(servers)) {
-            if (!link) continue;
-
-            hasAnyServers = true;
-            const btn = document.createElement("button");
-            btn.innerText = `${quality}p (${serverName})`;
-            btn.onclick = () => {
-              document.querySelectorAll('.servers button').forEach(b => b.classList.remove('active'));
-              btn.classList.add('active');
-              currentLink = link;
-              player.src({ src: link, type: "video/mp4" });
-              player.ready(() => player.play().catch(e => {
-                console.error("Play error:", e);
-                statusDiv.innerText = "💢 Failed to play. Try another server.";
-              }));
-            };
-            serversDiv.appendChild(btn);
-          }
-          for (const [serverName, link] of Object.entries(servers)) {
-            if (!link) continue;
-            const a = document.createElement("a");
-            a.href = link;
-            a.innerText = `${quality}p (${serverName})`;
-            a.className = "btn";
-            a.setAttribute("download", "");
-            a.target = "_blank";
-            downloadsDiv.appendChild(a);
-          }
-        }
-        if (hasAnyServers) {
-          const qualityOrder = ["1080", "720", "480"];
-          for (const q of qualityOrder) {
-            if (links[q] && Object.keys(links[q]).length > 0) {
-              const firstServer = Object.values(links[q])[0];
-              if (firstServer) {
-                currentLink = firstServer;
-                player.src({ src: firstServer, type: "video/mp4" });
-                const firstBtn = serversDiv.querySelector('button');
-                if (firstBtn) firstBtn.classList.add('active');
-                statusDiv.innerText = `✅ Ready to play ${q}p`;
-                break;
-              }
-            }
-          }
-        } else {
-          statusDiv.innerText = "💢 No playable servers found";
-        }
-      } catch (err) {
-        console.error("Load error:", err);
-        document.getElementById("status").innerHTML = `💢 Error: ${err.message}`;
-      }
-    }
-
-    function openDirect() {
-      if (currentLink) window.open(currentLink, "_blank");
-      else alert("No video selected");
-    }
-
-    function openVLC() {
-      if (currentLink) window.location.href = "vlc://" + currentLink;
-      else alert("No video selected");
-    }
-
-    async function forceScrap() {
-      const params = new URLSearchParams(window.location.search);
-      const show = params.get("show");
-      const ep = params.get("ep");
-      if (!show || !ep) {
-        alert("Missing show/ep parameters");
-        return;
-      }
-
-      document.getElementById("status").innerText = "🔄 Scraping...";
-
-      try {
-        const res = await fetch(`/scrape?show=${encodeURIComponent(show)}&ep=${encodeURIComponent(ep)}`);
-        const data = await res.json();
-
-        if (data.status === "queued") {
-          document.getElementById("status").innerText = "⏳ Scraping queued, please wait 30 seconds then refresh...";
-          setTimeout(() => loadEpisode(), 30000);
-        } else if (data.status === "cooldown") {
-          // Extract remaining time safely with null check
-          const remainingTimeMatch = data.message.match(/(\d+\.\d+) minutes/);
-          const remainingTime = remainingTimeMatch ? parseFloat(remainingTimeMatch[1]) : 10;
-          showCooldownPopup(remainingTime);
-          document.getElementById("status").innerText = "⏳ " + data.message;
-        } else if (data.status === "already_queued") {
-          document.getElementById("status").innerText = "⏳ " + data.message;
-        } else {
-          document.getElementById("status").innerText = "❌ Scraping failed";
-          alert("Scraping failed: " + (data.message || "Unknown error"));
-        }
-      } catch (err) {
-        console.error("Scrape error:", err);
-        document.getElementById("status").innerText = "❌ Scraping error";
-        alert("Scraping error: " + err.message);
-      }
-    }
+@app.get("/player", response_class=HTMLResponse)
+async def player_page(request: Request, show: str = Query(...), ep: int = Query(...)):
+    """Serve the player HTML (template rendered once at startup, see assets.py)"""
+    return _asset_response(request, asset_pipeline.page("player.html"))
 
-    function refreshPage() {
-      window.location.reload();
-    }
 
-    window.addEventListener('DOMContentLoaded', loadEpisode);
-  </script>
-</body>
-</html>'''
-    return HTMLResponse(html_content)
+@app.get("/assets/{name}")
+async def asset_file(request: Request, name: str):
+    """Fingerprinted player css/js - immutable, cached by browsers for a year"""
+    asset = asset_pipeline.get(name)
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return _asset_response(request, asset)
 
 
 
@@ -513,6 +356,14 @@ async def admin_page():
             <div id="addResult" class="result"></div>
         </div>
 
+        <div class="section">
+            <h2>Bulk Import</h2>
+            <p>CSV <code>show,ep,link480,link720,link1080</code> or JSON lines. First scrapes are spread out automatically.</p>
+            <input type="file" id="importFile" accept=".csv,.jsonl,.json,.txt">
+            <button id="importButton">Import</button>
+            <div id="importResult" class="result"></div>
+        </div>
+
         <div class="section">
             <h2>Remove Episode</h2>
             <form id="removeForm">
@@ -530,6 +381,7 @@ async def admin_page():
                 <button type="submit">Search</button>
             </form>
             <div id="searchResult" class="result"></div>
+            <button id="searchMore" style="display:none;">Next page</button>
         </div>
 
         <script>
@@ -552,12 +404,39 @@ async def admin_page():
             let data = await res.json();
             document.getElementById('removeResult').innerText = JSON.stringify(data, null, 2);
         };
+        document.getElementById('importButton').onclick = async () => {
+            let file = document.getElementById('importFile').files[0];
+            if (!file) return;
+            let jobId = Math.random().toString(36).slice(2, 14);
+            let out = document.getElementById('importResult');
+            let poll = setInterval(async () => {
+                let res = await fetch('/admin/import_status?job_id=' + jobId);
+                if (res.ok) out.innerText = JSON.stringify(await res.json(), null, 2);
+            }, 1000);
+            try {
+                let res = await fetch('/admin/bulk_import?job_id=' + jobId, {method: 'POST', body: file});
+                out.innerText = JSON.stringify(await res.json(), null, 2);
+            } finally {
+                clearInterval(poll);
+            }
+        };
+        let searchNext = null;
+        async function searchPage(show, after) {
+            let url = '/admin/search_episode?show=' + encodeURIComponent(show) + (after !== null ? '&after=' + after : '');
+            let res = await fetch(url);
+            let data = await res.json();
+            searchNext = data.next;
+            document.getElementById('searchResult').innerText = JSON.stringify(data, null, 2);
+            document.getElementById('searchMore').style.display = data.next !== null ? 'inline-block' : 'none';
+        }
         document.getElementById('searchForm').onsubmit = async (e) => {
             e.preventDefault();
             let fd = new FormData(e.target);
-            let res = await fetch('/admin/search_episode?show='+fd.get('show'));
-            let data = await res.json();
-            document.getElementById('searchResult').innerText = JSON.stringify(data, null, 2);
+            await searchPage(fd.get('show'), null);
+        };
+        document.getElementById('searchMore').onclick = async () => {
+            let fd = new FormData(document.getElementById('searchForm'));
+            await searchPage(fd.get('show'), searchNext);
         };
         </script>
     </body>
@@ -567,72 +446,359 @@ async def admin_page():
 
 
 
-# Global dictionary to track last scrape times for each episode
-last_scrape_times = {}
+# Last force-scrape time per episode; entries expire with the cooldown so the map stays bounded
+last_scrape_times = ExpiringDict(SCRAPE_COOLDOWN_SECONDS, COOLDOWN_MAX_ENTRIES)
 
 
 
 
 @app.get("/scrape")
-async def scrape_handler(show: str = Query(...), ep: int = Query(...)):
-    """Queue-based scraping with PER-EPISODE 10-minute cooldown"""
+async def scrape_handler(show: str = Query(...), ep: int = Query(...), mode: str = Query("incremental")):
+    """
+    Queue-based scraping with PER-EPISODE 10-minute cooldown.
+    mode=incremental revalidates cached servers and only scrapes qualities that
+    are short of servers; mode=full re-scrapes every quality.
+    """
+    if mode not in REFRESH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {REFRESH_MODES}")
     ep_id = f"{show}:{ep}"
     doc = await get_episode(ep_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Episode not found")
 
-    # Check if the episode is already queued
-    if ep_id in app.state.queued_episodes:
+    # Check if the last scrape was less than 10 minutes ago
+    remaining = last_scrape_times.remaining(ep_id)
+    if remaining > 0:
+        remaining_time = remaining / 60  # Convert to minutes
+        return {
+            "status": "cooldown",
+            "message": f"Please wait {remaining_time:.1f} minutes before scraping again."
+        }
+
+    status, seconds = await enqueue_scrape(ep_id, show, ep, mode)
+    if status == "already_queued":
         return {"status": "already_queued", "message": f"This episode is already in the scrape queue"}
+    if status == "busy":
+        logger.warning(f"🚫 Scrape queue full, rejecting {ep_id} (retry in {seconds}s)")
+        return JSONResponse(
+            {
+                "status": "busy",
+                "message": f"Scrape queue is full. Please try again in {seconds} seconds.",
+                "retry_after": seconds,
+            },
+            status_code=429,
+            headers={"Retry-After": str(seconds)},
+        )
+
+    # Update the last scrape time only once the scrape is admitted
+    last_scrape_times.set(ep_id, datetime.now(timezone.utc))
 
-    # Check if the last scrape was less than 10 minutes ago
-    last_scrape_time = last_scrape_times.get(ep_id)
-    if last_scrape_time:
-        current_time = datetime.now(timezone.utc)
-        time_elapsed = (current_time - last_scrape_time).total_seconds() / 60  # Convert to minutes
-        if time_elapsed < 10:
-            remaining_time = 10 - time_elapsed
-            return {
-                "status": "cooldown",
-                "message": f"Please wait {remaining_time:.1f} minutes before scraping again."
-            }
+    logger.info(f"✅ Scrape queued for {ep_id} - other episodes can still be scraped")
+    return {
+        "status": "queued",
+        "message": "Scrape queued; will run shortly",
+        "estimated_seconds": seconds,
+    }
 
-    # Update the last scrape time
-    last_scrape_times[ep_id] = datetime.now(timezone.utc)
 
-    # Add to queue and track it
-    app.state.queued_episodes.add(ep_id)
-    await app.state.scrape_queue.put((ep_id, show, ep))
 
-    logger.info(f"✅ Scrape queued for {ep_id} - other episodes can still be scraped")
-    return {"status": "queued", "message": "Scrape queued; will run shortly"}
+@app.get("/scrape/events")
+async def scrape_events(request: Request, show: str = Query(...), ep: int = Query(...)):
+    """Server-sent events stream of scrape progress for one episode"""
+    ep_id = f"{show}:{ep}"
+
+    if not leader_lease.is_leader:
+        # Progress lives on the leader; follow its mirrored events instead
+        return StreamingResponse(
+            _remote_scrape_events(request, ep_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def stream():
+        sub = episode_events.subscribe(ep_id)
+        try:
+            # A scrape forwarded by another worker waits in scrape_requests until we claim it
+            pending = leader_lease.enabled and await scrape_requests_collection.find_one({"_id": ep_id}, {"_id": 1})
+
+            # Replay current state so a late subscriber never waits for an event that already happened
+            current = episode_events.active.get(ep_id)
+            if current:
+                yield format_sse(current)
+            elif pending:
+                yield format_sse({"type": "queued", "episode": ep_id, "position": None})
+            else:
+                yield format_sse({"type": "idle", "episode": ep_id})
+                return
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["type"] in ("done", "failed"):
+                    break
+        finally:
+            episode_events.unsubscribe(ep_id, sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _remote_scrape_events(request: Request, ep_id: str):
+    """SSE on a non-leader worker: poll the leader's mirrored events (scrape_status)"""
+    pending = await scrape_requests_collection.find_one({"_id": ep_id}, {"createdAt": 1})
+    status = await scrape_status_collection.find_one({"_id": ep_id})
+    event = (status or {}).get("event")
+
+    if pending:
+        since = pending["createdAt"].timestamp()
+        yield format_sse({"type": "queued", "episode": ep_id, "position": None})
+    elif event and event["type"] not in ("done", "failed"):
+        since = event["ts"]
+        yield format_sse(event)
+    else:
+        yield format_sse({"type": "idle", "episode": ep_id})
+        return
+
+    idle_polls = 0
+    while not await request.is_disconnected():
+        await asyncio.sleep(1)
+        status = await scrape_status_collection.find_one({"_id": ep_id})
+        event = (status or {}).get("event")
+        if event and event["ts"] > since:
+            since = event["ts"]
+            idle_polls = 0
+            yield format_sse(event)
+            if event["type"] in ("done", "failed"):
+                break
+        else:
+            idle_polls += 1
+            if idle_polls % 15 == 0:
+                yield ": keepalive\n\n"
+
+
+@app.post("/beacon")
+async def playback_beacon(request: Request):
+    """
+    Batched playback error/stall reports from the player. When enough distinct
+    clients report the same server it is evicted from the episode cache and
+    just that quality is queued for an incremental refresh.
+    """
+    try:
+        payload = json.loads(await request.body() or b"{}")  # sendBeacon posts text/plain
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid beacon payload")
+
+    # Distinct clients are counted per IP so one browser cannot evict a server on its own
+    client = client_address(request)
 
+    evicted = 0
+    for ep_id, quality, url, kind in parse_beacon_events(payload):
+        if not beacon_tracker.allow(client):
+            break
+        if not beacon_tracker.report(client, ep_id, quality, url):
+            continue
+
+        removed = await remove_cached_server(ep_id, quality, url)
+        if not removed:
+            # Not a cached server of this episode/quality: nothing to penalise or refresh
+            continue
+        logger.warning(f"📉 {ep_id} {quality}p: {kind} reported by enough clients, evicted {url}")
+        mirror_stats.record_failure(url)
+        evicted += removed
+
+        show, ep = ep_id.rsplit(":", 1)
+        status, _ = await enqueue_scrape(ep_id, show, int(ep), "incremental", [quality])
+        if status == "busy":
+            logger.info(f"Queue full; {ep_id} {quality}p will be refreshed by the auto-scraper")
+
+    return {"status": "ok", "evicted": evicted}
 
 
 @app.get("/get_link")
-async def get_link(show: str = Query(...), ep: int = Query(...)):
-    """Get episode links (cached or master)"""
+async def get_link(request: Request, background_tasks: BackgroundTasks, show: str = Query(...), ep: int = Query(...)):
+    """
+    Get episode links (cached or master).
+    Cached responses are serialized/compressed once per cache version and
+    served with a strong ETag, so refreshing players usually get a 304.
+    """
     ep_id = f"{show}:{ep}"
-    
-    server_info = await check_episode_servers(ep_id)
-    
-    cached = await get_cached(ep_id)
-    if cached:
-        return {
-            "status": "cached", 
-            "links": cached,
-            "server_info": server_info
+    cache_doc = await get_cached_doc(ep_id)
+    records = cache_records(cache_doc)
+    if records:
+        # Popularity + next-episode signals for the prefetcher, written after the response is sent
+        background_tasks.add_task(record_view, show, ep)
+        now = datetime.now(timezone.utc)
+        # Pre-resolved redirect targets in this payload and when the next one lapses
+        resolved_expiries = [r["resolvedExpireAt"] for r in records if r.get("resolvedExpireAt")]
+        fresh_expiries = [t for t in resolved_expiries if t > now]
+        # Version = cache write time + this episode's hosts' quantized scores (rankings shift as
+        # mirrors are measured) + how many resolved URLs are still servable (a lapsed one falls back)
+        version = (cache_doc.get("updatedAt"), mirror_stats.ranking_signature(records), len(fresh_expiries))
+        payload = payload_cache.get(ep_id, version)
+        if payload is None:
+            # Fastest mirrors first (measured TTFB + throughput per host)
+            payload = payload_cache.put(ep_id, version, {
+                "status": "cached", 
+                "servers": mirror_stats.rank_records(records),
+                "relay": relay.RELAY_ENABLED,
+                "server_info": server_info_from_cache(cache_doc)
+            })
+
+        expire_at = min([cache_doc["expireAt"]] + fresh_expiries) if cache_doc.get("expireAt") else None
+        max_age = max(int((expire_at - now).total_seconds()), 0) if expire_at else 0
+        body, encoding, etag = payload.negotiate(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={max_age}",
+            "Vary": "Accept-Encoding",
         }
+        if payload.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="application/json", headers=headers)
 
     doc = await get_episode(ep_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Episode not found")
-    
-    return {
+    background_tasks.add_task(record_view, show, ep)
+
+    return JSONResponse({
         "status": "master", 
         "links": doc.get("master", {}),
-        "server_info": server_info
-    }
+        "server_info": server_info_from_cache(cache_doc)
+    }, headers={"Cache-Control": "no-cache"})
+
+
+MAX_BATCH_EPISODES = 200
+
+
+def _parse_episode_list(eps: Optional[str], start: Optional[int], end: Optional[int]):
+    if eps:
+        try:
+            numbers = [int(x) for x in eps.split(",") if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="eps must be a comma separated list of numbers")
+    elif start is not None and end is not None:
+        # Check the span before materializing it
+        if end < start or end - start + 1 > MAX_BATCH_EPISODES:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BATCH_EPISODES} episodes per request")
+        numbers = list(range(start, end + 1))
+    else:
+        raise HTTPException(status_code=400, detail="Pass eps=1,2,3 or start=&end=")
+    numbers = list(dict.fromkeys(numbers))
+    if not numbers or len(numbers) > MAX_BATCH_EPISODES:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BATCH_EPISODES} episodes per request")
+    return numbers
+
+
+@app.get("/get_links")
+async def get_links(
+    show: str = Query(...),
+    eps: Optional[str] = Query(None),
+    start: Optional[int] = Query(None),
+    end: Optional[int] = Query(None),
+    stream: bool = Query(False),
+):
+    """
+    Batch link status for a season page: one $in query per collection no matter
+    how many episodes. stream=true returns NDJSON, one line per episode.
+    """
+    numbers = _parse_episode_list(eps, start, end)
+    ids = [f"{show}:{n}" for n in numbers]
+
+    episodes = {doc["_id"]: doc async for doc in episodes_collection.find({"_id": {"$in": ids}}, {"master": 1})}
+    caches = {doc["_id"]: doc async for doc in cache_collection.find({"_id": {"$in": ids}}, {"servers.quality": 1, "links": 1, "expireAt": 1})}
+    now = datetime.now(timezone.utc)
+
+    def summaries():
+        for n, ep_id in zip(numbers, ids):
+            yield n, summarize_episode(episodes.get(ep_id), caches.get(ep_id), now)
+
+    if stream:
+        async def ndjson():
+            for n, summary in summaries():
+                yield json.dumps({"ep": n, **summary}, separators=(",", ":")) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    return {"show": show, "episodes": {str(n): summary for n, summary in summaries()}}
+
+
+@app.get("/relay")
+async def relay_stream(
+    request: Request,
+    show: str = Query(...), ep: int = Query(...), quality: str = Query(...), url: str = Query(...)
+):
+    """
+    Optional Range relay for one cached server of an episode (RELAY_ENABLED=1).
+    The first RELAY_PREFIX_MB of hot episodes are served from the local mmap'd
+    prefix cache so playback starts at once; the rest streams from the mirror.
+    """
+    if not relay.RELAY_ENABLED:
+        raise HTTPException(status_code=404, detail="Relay is disabled")
+
+    # Only relay servers we cached for this episode - never an open proxy
+    target = canonical_url(url)
+    record = next((
+        r for r in cache_records(await get_cached_doc(f"{show}:{ep}"))
+        if r["quality"] == quality and target in (r["url"], canonical_url(r.get("resolvedUrl") or r["url"]))
+    ), None)
+    if not record:
+        raise HTTPException(status_code=403, detail="Not a cached server of this episode")
+    fetch_url, _ = serve_url(record)
+    range_header = request.headers.get("range")
+
+    meta = relay.prefix_cache.get(record["url"])
+    if meta is not None:
+        total = meta["total"]
+        requested = relay.parse_range(range_header, total)
+        if not (range_header and requested is None):
+            start, end = requested or (0, total - 1)
+            end = total - 1 if end is None else min(end, total - 1)
+            if start > end:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+            headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+            if requested:
+                headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+            # The prefix is mmap'd inside the generator, so a client gone before streaming holds nothing
+            return StreamingResponse(
+                relay.stream_prefixed(record["url"], fetch_url, start, end),
+                status_code=206 if requested else 200, media_type=meta["type"], headers=headers
+            )
+
+    # Not cached: plain pass-through, and warm the prefix if the episode is hot
+    session = await relay.get_session()
+    try:
+        upstream = await session.get(fetch_url, headers={"Range": range_header} if range_header else {})
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Mirror unreachable: {e}")
+    if upstream.status not in (200, 206):
+        upstream.release()
+        raise HTTPException(status_code=502, detail=f"Mirror answered {upstream.status}")
+
+    hits = await hits_collection.find_one({"_id": f"{show}:{ep}"}, {"score": 1, "updatedAt": 1})
+    if hits and decayed_score(hits.get("score"), hits.get("updatedAt")) >= relay.RELAY_HOT_SCORE:
+        # Not a BackgroundTask: those would only run after this whole stream finished
+        relay.prefix_cache.schedule_fill(record["url"], fetch_url)
+
+    async def body():
+        try:
+            async for chunk in upstream.content.iter_chunked(relay.RELAY_CHUNK):
+                yield chunk
+        finally:
+            upstream.release()
+
+    headers = {h: upstream.headers[h] for h in relay.PASSTHROUGH_HEADERS if h in upstream.headers}
+    # release() is idempotent; the background task covers a stream that never started
+    return StreamingResponse(body(), status_code=upstream.status, headers=headers,
+                             background=BackgroundTask(upstream.release))
 
 
 @app.post("/admin/add_episode")
@@ -652,21 +818,156 @@ async def admin_add_episode(
         return JSONResponse({"status":"error","msg":"Need at least one link"}, status_code=400)
 
     await add_episode(ep_id, master)
-    return {"status":"ok","episode":ep_id,"player_link":f"/player?show={show}&ep={ep}"}
+
+    # Reuse scrapes of the same master URLs (re-added episode, shared uploads) instead of waiting
+    reused = {}
+    for quality, url in master.items():
+        entry = await linkcache.lookup(url)
+        if entry and entry[0]:
+            servers, expire_at = entry
+            # Capped at the link cache entry's own expiry; later qualities may only shorten it
+            ttl = linkcache.remaining_ttl(expire_at, linkcache.link_ttl(url))
+            await set_cached_quality(ep_id, quality, servers, ttl=ttl, extend=not reused)
+            reused[quality] = len(servers)
+
+    return {"status":"ok","episode":ep_id,"player_link":f"/player?show={show}&ep={ep}","reused":reused}
+
+
+@app.post("/admin/bulk_import")
+async def admin_bulk_import(request: Request, job_id: Optional[str] = None):
+    """
+    Import many episodes from a streamed CSV (show,ep,link480,link720,link1080)
+    or JSON-lines body. Rows are validated, written with bulk_write in batches,
+    and each episode's first scrape is staggered (scrapeAfter) at
+    IMPORT_SCRAPES_PER_HOUR. Progress is kept in the jobs collection - poll
+    /admin/import_status?job_id=... (pass your own job_id to poll during the upload).
+    """
+    job_id = job_id or uuid.uuid4().hex[:12]
+    now = datetime.now(timezone.utc)
+    start = bulk_import.schedule_start(await latest_scrape_after())
+    progress = {"lines": 0, "imported": 0, "rejected": 0}
+    errors = []
+    await jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"type": "bulk_import", "status": "running", "createdAt": now, **progress}},
+        upsert=True
+    )
+
+    batch = []
+    fmt, header = None, None
+
+    async def flush():
+        times = bulk_import.scrape_schedule(start, progress["imported"], len(batch))
+        progress["imported"] += await bulk_add_episodes(batch, times, job_id)
+        batch.clear()
+        await jobs_collection.update_one({"_id": job_id}, {"$set": {**progress, "updatedAt": datetime.now(timezone.utc)}})
+
+    try:
+        async for line in bulk_import.iter_lines(request.stream()):
+            if not line.strip():
+                continue
+            progress["lines"] += 1
+            if fmt is None:
+                fmt = bulk_import.detect_format(line, request.headers.get("content-type", ""))
+                if fmt == "csv" and line.lower().startswith("show,"):
+                    header = [h.strip().lower() for h in line.split(",")]
+                    continue
+            try:
+                batch.append(bulk_import.parse_line(line, fmt, header))
+            except (bulk_import.InvalidRow, csv.Error) as e:
+                progress["rejected"] += 1
+                if len(errors) < bulk_import.MAX_REPORTED_ERRORS:
+                    errors.append({"line": progress["lines"], "error": str(e)})
+                continue
+            if len(batch) >= bulk_import.IMPORT_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except Exception as e:
+        # A job left "running" would be polled forever; earlier batches stay imported
+        await jobs_collection.update_one({"_id": job_id}, {"$set": {
+            **progress, "status": "failed", "error": str(e), "errors": errors,
+            "updatedAt": datetime.now(timezone.utc)
+        }})
+        logger.exception(f"Bulk import {job_id} failed after {progress['imported']} episodes: {e}")
+        raise
+
+    last_scrape = bulk_import.scrape_schedule(start, max(progress["imported"] - 1, 0), 1)[0]
+    summary = {
+        **progress,
+        "status": "done",
+        "errors": errors,
+        "scrapes_from": start,
+        "scrapes_until": last_scrape if progress["imported"] else None,
+    }
+    await jobs_collection.update_one({"_id": job_id}, {"$set": {**summary, "updatedAt": datetime.now(timezone.utc)}})
+    logger.info(f"📦 Bulk import {job_id}: {progress['imported']} imported, {progress['rejected']} rejected")
+    return {"job_id": job_id, **summary}
+
+
+@app.get("/admin/import_status")
+async def admin_import_status(job_id: str):
+    """Import progress plus how many of its staged first scrapes are due / done"""
+    job = await jobs_collection.find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    now = datetime.now(timezone.utc)
+    ids = [doc["_id"] async for doc in episodes_collection.find({"importJob": job_id}, {"_id": 1})]
+    due = await episodes_collection.count_documents({"importJob": job_id, "scrapeAfter": {"$lte": now}})
+    cached = await cache_collection.count_documents({"_id": {"$in": ids}}) if ids else 0
+    return {**job, "scrapes": {"total": len(ids), "due": due, "cached": cached}}
 
 
 @app.post("/admin/remove_episode")
 async def admin_remove_episode(show: str = Form(...), ep: int = Form(...)):
     ep_id = f"{show}:{ep}"
-    res = await episodes_collection.delete_one({"_id": ep_id})
-    return {"status": "ok" if res.deleted_count else "not_found", "episode": ep_id}
+    deleted = await remove_episode(ep_id)
+    return {"status": "ok" if deleted else "not_found", "episode": ep_id}
+
+
+@app.get("/admin/health")
+async def admin_health():
+    """
+    Catalog link health per show from the show_health summary (one doc per
+    show, kept current by every episode/cache write - no episode scan).
+    """
+    shows = await get_show_health()
+    totals = {k: sum(s.get(k, 0) for s in shows) for k in ("episodes", "fresh", "stale", "missing", "underServed")}
+    return {"min_servers": MIN_SERVERS_REQUIRED, "totals": totals, "shows": shows}
+
+
+@app.post("/admin/health/rebuild")
+async def admin_health_rebuild():
+    """Reconcile show_health with the episodes/cache collections (repairs any missed update)"""
+    shows = await rebuild_show_health(force=True)
+    return {"status": "ok", "shows": shows}
+
+
+MAX_SEARCH_PAGE = 200
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
 
 
 @app.get("/admin/search_episode")
-async def admin_search_episode(show: str):
-    cursor = episodes_collection.find({"_id":{"$regex":f"^{show}:"}})
-    docs = await cursor.to_list(1000)
-    return {"count":len(docs),"episodes":docs}
+async def admin_search_episode(show: str, after: Optional[int] = None, limit: int = Query(50, ge=1, le=MAX_SEARCH_PAGE)):
+    """
+    Episodes of a show via the (show, ep) index, keyset-paginated: pass the
+    returned `next` as `after` for the following page. Streamed as it is read.
+    """
+    async def stream():
+        yield '{"episodes":['
+        count, last_ep = 0, None
+        async for doc in search_episodes(show, after, limit):
+            yield ("," if count else "") + json.dumps(doc, default=_json_default)
+            count += 1
+            last_ep = doc.get("ep")
+        next_cursor = last_ep if count == limit else None
+        yield f'],"count":{count},"next":{json.dumps(next_cursor)}}}'
+
+    return StreamingResponse(stream(), media_type="application/json")
 
 
 @app.get("/debug/episode")
@@ -682,5 +983,23 @@ async def debug_episode(show: str = Query(...), ep: int = Query(...)):
     }
 
 
+@app.get("/debug/mirrors")
+async def debug_mirrors():
+    """Rolling per-host speed measurements used to rank servers"""
+    return {
+        "hosts": mirror_stats.snapshot(),
+        "beacons": beacon_tracker.stats(),
+        "linkcache": linkcache.snapshot(),
+        "payloads": payload_cache.stats(),
+        "hedging": extract_timings.snapshot(),
+        "browser_state": browser_state.snapshot(),
+        "playwright_driver": scraper.driver_stats,
+        "http_fetch": fetch_stats,
+        "intercept": intercept_policy.snapshot(),
+        "redirects": redirect_cache.snapshot(),
+        "relay": relay.prefix_cache.snapshot() if relay.RELAY_ENABLED else None,
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
\ No newline at end of file
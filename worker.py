@@ -1,35 +1,95 @@
 # worker.py
 import asyncio
 import os
-from cache import set_cached, get_cached
-from scraper import scrape_vcloud
+import time
 import logging
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from db import episodes_collection, cache_collection, hits_collection, hit_rank_threshold
+from refresh import refresh_episode
 
 logger = logging.getLogger("worker")
 logging.basicConfig(level=logging.INFO)
 
-# Example episodes to pre-warm (in real life: from DB)
-# Format: list of dicts: {"source":"vcloud", "url": "..."}
-TO_PREFETCH = []  # fill from your DB: episodes with vcloud url
-
+# Prefetch set is built automatically from two signals recorded by /get_link:
+#   1. decayed hit counter per episode (popular episodes stay warm)
+#   2. "someone opened show:N" -> warm show:N+1 before they click Next
 PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL_SECONDS", 15*60))  # every 15 min
+PREFETCH_BUDGET_PER_HOUR = int(os.getenv("PREFETCH_BUDGET_PER_HOUR", 20))  # max prefetch scrapes per hour
+PREFETCH_CACHE_TTL = int(os.getenv("PREFETCH_CACHE_TTL", 21600))
+PREFETCH_CANDIDATES = 50
+NEXT_HINT_WINDOW = timedelta(hours=2)
+FRESH_MARGIN = timedelta(minutes=30)  # still warm if the cache outlives this margin
+MIN_HIT_SCORE = 0.5
+
+
+class PrefetchBudget:
+    """Sliding one-hour window of prefetch scrapes"""
+
+    def __init__(self, per_hour: int):
+        self.per_hour = per_hour
+        self._spent = deque()
+
+    def remaining(self) -> int:
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return max(self.per_hour - len(self._spent), 0)
+
+    def spend(self):
+        self._spent.append(time.monotonic())
+
 
-async def prefetch_loop():
+async def build_prefetch_set(limit: int = PREFETCH_CANDIDATES):
+    """Episode ids worth warming now: next-episode hints first, then by decayed popularity"""
+    now = datetime.now(timezone.utc)
+
+    hinted = [doc["_id"] async for doc in hits_collection.find(
+        {"nextHintAt": {"$gte": now - NEXT_HINT_WINDOW}}, {"_id": 1}
+    ).sort("nextHintAt", -1).limit(limit)]
+
+    # `rank` orders by decayed score without decaying anything; the threshold is MIN_HIT_SCORE as of now
+    popular = [doc["_id"] async for doc in hits_collection.find(
+        {"rank": {"$gt": hit_rank_threshold(MIN_HIT_SCORE, now)}}, {"_id": 1}
+    ).sort("rank", -1).limit(limit)]
+
+    candidates = list(dict.fromkeys(hinted + popular))
+    if not candidates:
+        return []
+
+    # Only real episodes whose cache is missing or about to expire
+    existing = {doc["_id"] async for doc in episodes_collection.find({"_id": {"$in": candidates}}, {"_id": 1})}
+    fresh = {doc["_id"] async for doc in cache_collection.find(
+        {"_id": {"$in": candidates}, "expireAt": {"$gt": now + FRESH_MARGIN}}, {"_id": 1}
+    )}
+    return [ep_id for ep_id in candidates if ep_id in existing and ep_id not in fresh]
+
+
+async def prefetch_loop(lock: asyncio.Lock = None):
+    """Warm episodes people are about to watch, within PREFETCH_BUDGET_PER_HOUR scrapes"""
+    budget = PrefetchBudget(PREFETCH_BUDGET_PER_HOUR)
     while True:
-        if not TO_PREFETCH:
-            await asyncio.sleep(5)
-            continue
-        for item in TO_PREFETCH:
-            try:
-                key = f"linkcache:{item['source']}:{item['url']}"
-                cached = await get_cached(key)
-                # Always refresh if older than TTL or not exists
-                links = await scrape_vcloud(item['url'])
-                if links:
-                    await set_cached(key, links, ttl=PREFETCH_INTERVAL + 60)
-                    logger.info("Prefetched %s", item['url'])
-            except Exception as e:
-                logger.exception("Prefetch error: %s", e)
+        try:
+            to_prefetch = await build_prefetch_set()
+            if to_prefetch:
+                logger.info("Prefetch candidates: %d (budget left %d)", len(to_prefetch), budget.remaining())
+
+            # Sequential on purpose: one browser at a time on a 512MB instance
+            for ep_id in to_prefetch:
+                if budget.remaining() <= 0:
+                    logger.info("Prefetch budget exhausted for this hour")
+                    break
+                budget.spend()
+                try:
+                    async with lock or nullcontext():
+                        results = await refresh_episode(ep_id, mode="incremental", ttl=PREFETCH_CACHE_TTL)
+                    if results:
+                        logger.info("Prefetched %s (%d servers)", ep_id, sum(len(v) for v in results.values()))
+                except Exception as e:
+                    logger.exception("Prefetch error for %s: %s", ep_id, e)
+        except Exception as e:
+            logger.exception("Prefetch loop error: %s", e)
         await asyncio.sleep(PREFETCH_INTERVAL)
 
 if __name__ == "__main__":